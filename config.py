@@ -1,11 +1,13 @@
 # config.py
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 
 # .env dosyasını yükle
 load_dotenv()
 
+@lru_cache(maxsize=None)
 def get_env(key: str, default: Any = None, type_cast: type = str) -> Any:
     """Tip dönüşümlü çevre değişkeni okuyucu"""
     value = os.getenv(key, default)
@@ -35,9 +37,11 @@ GENERAL_SETTINGS: Dict[str, Any] = {
 }
 
 # Model Parametreleri
+ARIMA_ORDER: Tuple[int, ...] = tuple(map(int, get_env('ARIMA_ORDER', '1,1,1').split(',')))
+
 MODEL_PARAMS: Dict[str, Any] = {
-    'signal_timeframes': get_env('SIGNAL_TIMEFRAMES', '5T,15T,60T,240T').split(','),
-    'arima_order': tuple(map(int, get_env('ARIMA_ORDER', '1,1,1').split(','))),
+    'signal_timeframes': tuple(get_env('SIGNAL_TIMEFRAMES', '5T,15T,60T,240T').split(',')),
+    'arima_order': ARIMA_ORDER,
     'atr_period': get_env('ATR_PERIOD', 14, int),
     'atr_multiplier': get_env('ATR_MULTIPLIER', 2.0, float),
     'risk_thresholds': {
@@ -63,6 +67,6 @@ API_LIMITS: Dict[str, Dict[str, int]] = {
 }
 
 # Geliştirici Uyarısı
-if all(v == '' for v in API_KEYS.values()):
+if not any(API_KEYS.values()):
     import logging
     logging.warning("API anahtarları tanımlanmamış! Lütfen .env dosyasını kontrol edin.")
\ No newline at end of file
@@ -12,6 +12,8 @@ os.makedirs('logs', exist_ok=True)
 os.makedirs('data', exist_ok=True)
 os.makedirs('models', exist_ok=True)
 
+# Uygulama genelinde tek Logger örneği; exception handler ve main() aynı handler'ları paylaşır
+LOGGER = Logger(log_file=LOG_PATH)
 
 # Global exception handler
 def handle_exception(exc_type, exc_value, exc_traceback):
@@ -19,21 +21,16 @@ def handle_exception(exc_type, exc_value, exc_traceback):
         sys.__excepthook__(exc_type, exc_value, exc_traceback)
         return
 
-    # Logger'ı burada başlatın; path artık doğru çalışma dizinine göre ayarlandı.
-    logger = Logger(log_file='logs/app_log.json')
-    logger.critical(f"Unhandled exception: {exc_value}", "MAIN_APP", extra={'traceback': traceback.format_exception(exc_type, exc_value, exc_traceback)})
+    LOGGER.critical(f"Unhandled exception: {exc_value}", "MAIN_APP", extra={'traceback': traceback.format_exception(exc_type, exc_value, exc_traceback)})
     tk.messagebox.showerror("Hata", f"Beklenmedik bir hata oluştu: {exc_value}")
 
 sys.excepthook = handle_exception
 
 def main():
-    # Logger'ı başlat
-    logger = Logger(log_file='logs/app_log.json')
-
     # Uygulamanın başladığına dair bir log mesajı ekleyelim
-    logger.info("Uygulama başarıyla başlatılıyor...", "MAIN_APP")
+    LOGGER.info("Uygulama başarıyla başlatılıyor...", "MAIN_APP")
 
-    app = MainWindow(logger)
+    app = MainWindow(LOGGER)
 
     # Güncelleme döngüsünü, Tkinter'ın ana olay döngüsü başladıktan sonra çalışacak şekilde planlayın.
     # 10ms'lik kısa bir gecikme, mainloop'un tam olarak başlatılmasına olanak tanır.
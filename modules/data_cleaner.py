@@ -3,23 +3,206 @@ import sqlite3
 import pandas as pd
 import numpy as np
 from sklearn.cluster import DBSCAN
-from statsmodels.tsa.arima.model import ARIMA
+from sklearn.neighbors import NearestNeighbors
+from numba import njit
 import logging
+from .database import ensure_table, get_conn, read_frame, transaction, write_frame
+
+# Bu orandan fazla eksik veri içeren sütunlar interpolasyon yerine ARIMA ile doldurulur
+ARIMA_NAN_THRESHOLD = 0.1
+# Artımlı temizlikte imputasyon/DBSCAN için filigrandan önce yeniden okunan bağlam satırı sayısı
+CLEAN_CONTEXT_ROWS = 500
+
+@njit(cache=True)
+def _arima111_filter(d, phi, theta):
+    """Farkı alınmış seri üzerinde ARMA(1,1) Kalman filtresi (2 durumlu)"""
+    n = d.shape[0]
+    preds = np.empty(n)
+    a0 = 0.0
+    a1 = 0.0
+    # Lyapunov denklemi yerine basit varyans başlangıcı
+    var0 = 0.0
+    m0 = 0
+    for t in range(n):
+        if not np.isnan(d[t]):
+            var0 += d[t] * d[t]
+            m0 += 1
+    var0 = var0 / m0 if m0 > 0 else 1.0
+    p00 = var0
+    p01 = 0.0
+    p11 = var0 * theta * theta
+
+    sum_log_f = 0.0
+    sum_v2_f = 0.0
+    m = 0
+    for t in range(n):
+        preds[t] = a0
+        f = p00
+        if not np.isnan(d[t]) and f > 1e-12:
+            v = d[t] - a0
+            k0 = p00 / f
+            k1 = p01 / f
+            a0 += k0 * v
+            a1 += k1 * v
+            p11 = p11 - p01 * p01 / f
+            p01 = p01 - p00 * p01 / f
+            p00 = p00 - p00 * p00 / f
+            sum_log_f += np.log(f)
+            sum_v2_f += v * v / f
+            m += 1
+        # Tahmin adımı: T = [[phi, 1], [0, 0]], R = [1, theta]
+        new_p00 = phi * phi * p00 + 2.0 * phi * p01 + p11 + 1.0
+        a0 = phi * a0 + a1
+        a1 = 0.0
+        p00 = new_p00
+        p01 = theta
+        p11 = theta * theta
+
+    if m == 0:
+        return preds, np.inf
+    sigma2 = sum_v2_f / m
+    if sigma2 <= 0.0:
+        return preds, -np.inf
+    nll = 0.5 * (m * np.log(sigma2) + sum_log_f)
+    return preds, nll
+
+@njit(cache=True)
+def _arima111_nll(x, d):
+    """Kısıtsız parametrelerden (tanh ile |phi|,|theta| < 1) negatif log-olabilirlik"""
+    phi = 0.99 * np.tanh(x[0])
+    theta = 0.99 * np.tanh(x[1])
+    return _arima111_filter(d, phi, theta)[1]
+
+@njit(cache=True)
+def _fit_arima111(d, max_iter=200, tol=1e-8):
+    """Nelder-Mead ile ARIMA(1,1,1) phi/theta tahmini"""
+    simplex = np.array([[0.0, 0.0], [0.5, 0.0], [0.0, 0.5]])
+    values = np.empty(3)
+    for i in range(3):
+        values[i] = _arima111_nll(simplex[i], d)
+
+    for _ in range(max_iter):
+        order = np.argsort(values)
+        simplex = simplex[order]
+        values = values[order]
+        if abs(values[2] - values[0]) < tol:
+            break
+
+        centroid = (simplex[0] + simplex[1]) / 2.0
+        reflected = centroid + (centroid - simplex[2])
+        f_r = _arima111_nll(reflected, d)
+        if f_r < values[0]:
+            expanded = centroid + 2.0 * (centroid - simplex[2])
+            f_e = _arima111_nll(expanded, d)
+            if f_e < f_r:
+                simplex[2] = expanded
+                values[2] = f_e
+            else:
+                simplex[2] = reflected
+                values[2] = f_r
+        elif f_r < values[1]:
+            simplex[2] = reflected
+            values[2] = f_r
+        else:
+            contracted = centroid + 0.5 * (simplex[2] - centroid)
+            f_c = _arima111_nll(contracted, d)
+            if f_c < values[2]:
+                simplex[2] = contracted
+                values[2] = f_c
+            else:
+                for i in range(1, 3):
+                    simplex[i] = simplex[0] + 0.5 * (simplex[i] - simplex[0])
+                    values[i] = _arima111_nll(simplex[i], d)
+
+    best = simplex[np.argmin(values)]
+    return 0.99 * np.tanh(best[0]), 0.99 * np.tanh(best[1])
+
+@njit(cache=True)
+def _arima111_impute(y):
+    """ARIMA(1,1,1) tek adım tahminleriyle eksik değerleri doldurur"""
+    n = y.shape[0]
+    d = np.empty(n)
+    d[0] = np.nan
+    for t in range(1, n):
+        d[t] = y[t] - y[t - 1]
+    phi, theta = _fit_arima111(d)
+    preds, _ = _arima111_filter(d, phi, theta)
+
+    out = y.copy()
+    for t in range(1, n):
+        if np.isnan(out[t]) and not np.isnan(out[t - 1]):
+            out[t] = out[t - 1] + preds[t]
+    return out
 
 class DataCleaner:
     def __init__(self, db_path='data/database.db', logger=None):
         self.db_path = db_path
         self.logger = logger or logging.getLogger(__name__)
-        self.conn = sqlite3.connect(self.db_path)
+        self.conn = get_conn(self.db_path)
         self.cursor = self.conn.cursor()
-        
-    def load_raw_data(self, commodity_name):
-        """Ham verileri veritabanından yükler"""
+        self._numeric_cols = {}  # emtia -> DBSCAN'de kullanılan sayısal sütunlar
+        self._cleaned_index_ready = False
+        self._ensure_schema()
+
+    def _ensure_schema(self):
+        """Filigran tablosunu ve sorgu yolları için gerekli indeksleri oluşturur"""
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS clean_watermark (commodity TEXT PRIMARY KEY, last_cleaned_ts TEXT)"
+        )
         try:
-            query = f"SELECT * FROM raw_data WHERE commodity='{commodity_name}'"
-            df = pd.read_sql(query, self.conn)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.set_index('timestamp', inplace=True)
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_raw_commodity_ts ON raw_data(commodity, timestamp)"
+            )
+            self.conn.commit()
+        except sqlite3.OperationalError:
+            # raw_data tablosu henüz oluşturulmamış (ilk veri kaydında to_sql oluşturur)
+            pass
+
+    def _ensure_cleaned_unique_index(self):
+        """cleaned_data üzerinde (commodity, timestamp) UNIQUE indeksini oluşturur (transaction içinde çağrılır)"""
+        if self._cleaned_index_ready:
+            return
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='index' AND name='ux_cleaned_commodity_ts'"
+        ).fetchone()
+        if exists is None:
+            # Eski append davranışından kalan yinelenen satırları temizle (en son yazılanı tut)
+            self.conn.execute(
+                "DELETE FROM cleaned_data WHERE rowid NOT IN "
+                "(SELECT MAX(rowid) FROM cleaned_data GROUP BY commodity, timestamp)"
+            )
+            self.conn.execute(
+                "CREATE UNIQUE INDEX ux_cleaned_commodity_ts ON cleaned_data(commodity, timestamp)"
+            )
+        self._cleaned_index_ready = True
+
+    def _get_watermark(self, commodity_name):
+        """Emtia için son temizlenen ham veri zaman damgasını döndürür (yoksa None)"""
+        row = self.conn.execute(
+            "SELECT last_cleaned_ts FROM clean_watermark WHERE commodity=?", (commodity_name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _context_start(self, commodity_name, watermark):
+        """Filigrandan önceki CLEAN_CONTEXT_ROWS bağlam satırının hemen öncesindeki zaman damgası"""
+        row = self.conn.execute(
+            "SELECT timestamp FROM raw_data WHERE commodity=? AND timestamp <= ? "
+            "ORDER BY timestamp DESC LIMIT 1 OFFSET ?",
+            (commodity_name, watermark, CLEAN_CONTEXT_ROWS)
+        ).fetchone()
+        return row[0] if row else None
+
+    def load_raw_data(self, commodity_name, since=None):
+        """Ham verileri veritabanından yükler (since verilirse yalnızca daha yeni satırlar)"""
+        try:
+            if since is None:
+                query = "SELECT * FROM raw_data WHERE commodity=? ORDER BY timestamp"
+                params = (commodity_name,)
+            else:
+                query = "SELECT * FROM raw_data WHERE commodity=? AND timestamp > ? ORDER BY timestamp"
+                params = (commodity_name, since)
+            df = read_frame(query, self.conn, self.db_path, params=params,
+                            index_col='timestamp', parse_dates=['timestamp'], chunksize=100_000)
             self.logger.info(f"Raw data loaded for {commodity_name}")
             return df
         except Exception as e:
@@ -27,59 +210,97 @@ class DataCleaner:
             return None
 
     def clean_data(self, commodity_name):
-        """Tüm temizleme pipeline'ını çalıştırır"""
-        raw_df = self.load_raw_data(commodity_name)
+        """Temizleme pipeline'ını yalnızca filigrandan sonra gelen ham veriler için çalıştırır"""
+        watermark = self._get_watermark(commodity_name)
+        since = self._context_start(commodity_name, watermark) if watermark else None
+        raw_df = self.load_raw_data(commodity_name, since=since)
         if raw_df is None:
             return False
+        if raw_df.empty or (watermark and not (raw_df.index > pd.Timestamp(watermark)).any()):
+            self.logger.info(f"No new raw data to clean for {commodity_name}")
+            return True
+        last_ts = raw_df.index.max()
 
         # Eksik verileri impute et
         df_imputed = self._impute_missing_with_arima(raw_df)
         
         # Aykırı değerleri temizle
-        cleaned_df, outlier_mask = self._detect_outliers_with_dbscan(df_imputed)
+        cleaned_df, outlier_mask = self._detect_outliers_with_dbscan(df_imputed, commodity_name=commodity_name)
+        if watermark:
+            # Bağlam satırları zaten kaydedildi; yalnızca yeni satırları yaz
+            cleaned_df = cleaned_df[cleaned_df.index > pd.Timestamp(watermark)]
         
         # Temizlenmiş veriyi kaydet
-        self._save_cleaned_data(cleaned_df, commodity_name)
-        return True
+        return self._save_cleaned_data(cleaned_df, commodity_name, last_ts)
 
     def _impute_missing_with_arima(self, df):
-        """ARIMA ile eksik veri tahmini"""
-        for column in df.columns:
-            if df[column].isna().sum() > 0:
-                try:
-                    model = ARIMA(df[column], order=(1,1,1))
-                    model_fit = model.fit()
-                    predictions = model_fit.predict(start=df.index[0], end=df.index[-1])
-                    df[column].fillna(predictions, inplace=True)
-                    self.logger.info(f"ARIMA imputation done for {column}")
-                except Exception as e:
-                    self.logger.warning(f"ARIMA failed for {column}: {str(e)}")
+        """Eksik verileri doldurur: kısa boşluklar interpolasyon, uzun boşluklar ARIMA(1,1,1)"""
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        # Tüm sayısal sütunlar tek bir numpy bloğunda işlenir; DataFrame'e tek seferde geri yazılır
+        # copy=True: copy-on-write altında to_numpy salt okunur görünüm döndürebilir; np.copyto yazabilmeli
+        values = df[numeric_cols].to_numpy(dtype=np.float64, copy=True)
+        missing = np.isnan(values)
+        if not missing.any():
+            return df
+
+        nan_frac = missing.mean(axis=0)
+        for j in np.flatnonzero(nan_frac > ARIMA_NAN_THRESHOLD):
+            column = numeric_cols[j]
+            try:
+                imputed = _arima111_impute(np.ascontiguousarray(values[:, j]))
+                np.copyto(values[:, j], imputed, where=missing[:, j])
+                self.logger.info(f"ARIMA imputation done for {column}")
+            except Exception as e:
+                self.logger.warning(f"ARIMA failed for {column}: {str(e)}")
+
+        filled = pd.DataFrame(values, index=df.index, columns=numeric_cols)
+        # Kalan kısa boşluklar (ve ARIMA'nın dolduramadığı baştaki değerler) zamana göre interpolasyon
+        if np.isnan(values).any():
+            filled = filled.interpolate(method='time', limit_direction='both')
+        df[numeric_cols] = filled
         return df
 
-    def _detect_outliers_with_dbscan(self, df, eps=0.5, min_samples=5):
-        """DBSCAN ile aykırı değer tespiti"""
-        numeric_df = df.select_dtypes(include=[np.number])
-        clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(numeric_df)
+    def _detect_outliers_with_dbscan(self, df, eps=0.5, min_samples=5, commodity_name=None):
+        """DBSCAN ile aykırı değer tespiti (z-score ölçeklenmiş float32 özellikler üzerinde)"""
+        numeric_cols = self._numeric_cols.get(commodity_name)
+        if numeric_cols is None:
+            numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
+            if commodity_name is not None:
+                self._numeric_cols[commodity_name] = numeric_cols
+
+        # float32 kopya: ağaç sorgularında bant genişliğini yarıya indirir; ölçekleme yerinde yapılır
+        X = df[numeric_cols].to_numpy(dtype=np.float32, copy=True)
+        # Fiyat ve hacim sütunlarının L2 mesafesinde eşit ağırlık taşıması için z-score
+        np.subtract(X, X.mean(axis=0), out=X)
+        np.divide(X, X.std(axis=0) + 1e-12, out=X)
+
+        # Ball-tree ile eps komşuluk grafiği; DBSCAN mesafeleri yeniden hesaplamaz.
+        # Artımlı temizlikte her çağrı yeni satır gördüğünden grafik önbelleğe alınmaz.
+        nn = NearestNeighbors(radius=eps, algorithm='ball_tree', leaf_size=40, n_jobs=-1).fit(X)
+        graph = nn.radius_neighbors_graph(X, mode='distance')
+        clustering = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed', n_jobs=-1).fit(graph)
         outlier_mask = clustering.labels_ == -1
         cleaned_df = df[~outlier_mask]
         self.logger.info(f"Outliers removed: {outlier_mask.sum()} points")
         return cleaned_df, outlier_mask
 
-    def _save_cleaned_data(self, df, commodity_name):
-        """Temizlenmiş veriyi veritabanına kaydet"""
+    def _save_cleaned_data(self, df, commodity_name, last_ts):
+        """Temizlenmiş veriyi UPSERT ile kaydeder ve filigranı aynı transaction içinde günceller"""
         try:
-            df.reset_index(inplace=True)
-            df['commodity'] = commodity_name
-            df.to_sql('cleaned_data', self.conn, if_exists='append', index=False)
-            self.conn.commit()
+            df = df.reset_index().assign(commodity=commodity_name)
+            with transaction(self.conn):
+                ensure_table(self.conn, 'cleaned_data', df)
+                self._ensure_cleaned_unique_index()
+                write_frame(self.conn, 'cleaned_data', df, replace=True)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO clean_watermark (commodity, last_cleaned_ts) VALUES (?, ?)",
+                    (commodity_name, str(last_ts))
+                )
             self.logger.info(f"Cleaned data saved for {commodity_name}")
+            return True
         except Exception as e:
             self.logger.error(f"Data saving failed: {str(e)}")
-            self.conn.rollback()
-
-    def __del__(self):
-        """Veritabanı bağlantısını kapat"""
-        self.conn.close()
+            return False
 
 # Örnek kullanım
 if __name__ == "__main__":
@@ -1,19 +1,33 @@
 # modules/data_fetcher.py
-import requests
+import asyncio
+import httpx
+import orjson
+import numpy as np
 import pandas as pd
-import sqlite3
 import threading
 import time
-from config import API_KEYS
+from config import API_KEYS, API_LIMITS
+from .database import get_conn, insert_frame
 # REMOVE THIS LINE: from .logger import Logger  # <-- BU SATIRI SİLİN
 
+BINANCE_KLINES_URL = "https://fapi.binance.com/fapi/v1/klines"
+# Eşzamanlı Binance isteği üst sınırı (IP başına ağırlık limitini aşmamak için)
+MAX_CONCURRENT_FETCHES = 16
+
 class DataFetcher:
     def __init__(self, logger): # <-- 'logger' parametresini buraya ekleyin
         self.logger = logger # <-- Dışarıdan gelen logger objesini kullanın
         self.logger.info("DataFetcher başlatılıyor...", "DATA_FETCHER")
-        self.conn = sqlite3.connect('data/database.db')
+        self.conn = get_conn()
+        # Aynı hostlara tekrar eden isteklerde TCP/TLS el sıkışmasını tekrarlamamak için ortak HTTP/2 oturumu
+        self.session = httpx.Client(
+            http2=True,
+            timeout=10.0,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+        )
+        binance_weight = API_LIMITS['binance']['weight']
         self.api_usage = {
-            'binance': {'limit': 1200, 'remaining': 1200, 'reset_time': None},
+            'binance': {'limit': binance_weight, 'remaining': binance_weight, 'reset_time': None},
             'alphavantage': {'limit': 500, 'remaining': 500, 'reset_time': None},
             'twelvedata': {'limit': 800, 'remaining': 800, 'reset_time': None}
         }
@@ -30,46 +44,97 @@ class DataFetcher:
                 self.logger.warning(f"{api_name} API limit reached! Resets at {reset_time}", "API_LIMIT") # <-- Günlükleme mesajı
                                                                                                         # "API_LIMIT" modül adıyla
 
+    def _update_binance_weight(self, response):
+        """Binance'in döndürdüğü kullanılmış ağırlık başlığı ile sayacı senkronize eder"""
+        used_weight = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        if used_weight is None:
+            self._update_api_counter('binance')
+            return
+        with self.lock:
+            usage = self.api_usage['binance']
+            usage['remaining'] = max(0, usage['limit'] - int(used_weight))
+
     def _save_raw_data(self, df, commodity):
         """Ham verileri veritabanına kaydeder"""
         try:
-            df['commodity'] = commodity
-            df['fetch_time'] = pd.Timestamp.now()
-            df.to_sql('raw_data', self.conn, if_exists='append', index=False)
-            self.conn.commit()
+            df = df.assign(commodity=commodity, fetch_time=pd.Timestamp.now())
+            insert_frame(self.conn, 'raw_data', df)
             self.logger.info(f"Ham veri veritabanına kaydedildi: {commodity}", "DATABASE_SAVE") # <-- Günlükleme mesajı
         except Exception as e:
             self.logger.error(f"Database save failed: {str(e)}", "DATABASE_SAVE") # <-- Günlükleme mesajı
-            self.conn.rollback()
+
+    @staticmethod
+    def _parse_binance_klines(content):
+        """Binance kline yanıtını OHLCV DataFrame'ine dönüştürür"""
+        # Her kline 12 alanlıdır; yalnızca ilk 6'sı (zaman + OHLCV) kullanılır
+        klines = np.asarray(orjson.loads(content), dtype=object).reshape(-1, 12)
+        # Sütun bazlı (Fortran sıralı) float64 blok: her OHLCV sütunu bellekte bitişik
+        values = klines[:, 1:6].astype(np.float64, order='F')
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(klines[:, 0].astype(np.int64), unit='ms'),
+            'open': values[:, 0],
+            'high': values[:, 1],
+            'low': values[:, 2],
+            'close': values[:, 3],
+            'volume': values[:, 4]
+        }, copy=False)
 
     def fetch_binance_data(self, symbol, interval='1m', limit=500):
         """Binance'den kaldıraçlı işlem verilerini çeker"""
         try:
-            url = "https://fapi.binance.com/fapi/v1/klines"
             params = {
                 'symbol': symbol,
                 'interval': interval,
                 'limit': limit
             }
             
-            response = requests.get(url, params=params)
+            response = self.session.get(BINANCE_KLINES_URL, params=params)
             response.raise_for_status()
-            self._update_api_counter('binance')
+            self._update_binance_weight(response)
             
-            data = response.json()
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_volume', 'trades', 'taker_buy_volume',
-                'taker_buy_quote_volume', 'ignore'
-            ])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df = self._parse_binance_klines(response.content)
             self.logger.info(f"Binance'den {symbol} verisi çekildi.", "BINANCE_FETCHER") # <-- Günlükleme mesajı
-            return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+            return df
             
         except Exception as e:
             self.logger.error(f"Binance fetch error for {symbol}: {str(e)}", "BINANCE_FETCHER") # <-- Günlükleme mesajı
             return None
 
+    async def _async_fetch_binance(self, client, semaphore, symbol, interval, limit):
+        """Tek bir sembol için asenkron Binance isteği (semafor ile sınırlandırılmış)"""
+        async with semaphore:
+            try:
+                params = {
+                    'symbol': symbol,
+                    'interval': interval,
+                    'limit': limit
+                }
+                response = await client.get(BINANCE_KLINES_URL, params=params)
+                response.raise_for_status()
+                self._update_binance_weight(response)
+
+                df = self._parse_binance_klines(response.content)
+                self.logger.info(f"Binance'den {symbol} verisi çekildi.", "BINANCE_FETCHER")
+                return df
+
+            except Exception as e:
+                self.logger.error(f"Binance fetch error for {symbol}: {str(e)}", "BINANCE_FETCHER")
+                return None
+
+    async def fetch_many(self, symbols, interval='1m', limit=500):
+        """Birden fazla sembolü eşzamanlı çeker; {sembol: DataFrame veya None} döndürür"""
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+        async with httpx.AsyncClient(http2=True, timeout=10.0) as client:
+            frames = await asyncio.gather(*[
+                self._async_fetch_binance(client, semaphore, symbol, interval, limit)
+                for symbol in symbols
+            ])
+        return dict(zip(symbols, frames))
+
+    def fetch_many_sync(self, symbols, interval='1m', limit=500):
+        """fetch_many için senkron sarmalayıcı (UI iş parçacıkları için)"""
+        return asyncio.run(self.fetch_many(symbols, interval, limit))
+
     def fetch_alphavantage_data(self, symbol):
         """AlphaVantage'den temel verileri çeker"""
         try:
@@ -82,16 +147,24 @@ class DataFetcher:
                 'outputsize': 'full'
             }
             
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params)
             response.raise_for_status()
             self._update_api_counter('alphavantage')
             
-            data = response.json()['Time Series (1min)']
-            df = pd.DataFrame.from_dict(data, orient='index')
-            df.index = pd.to_datetime(df.index)
-            df.columns = ['open', 'high', 'low', 'close', 'volume']
+            data = orjson.loads(response.content)['Time Series (1min)']
+            bars = list(data.values())
+            n = len(bars)
+            # Sütunları doğrudan float64 dizileri olarak kur (object-dtype ara DataFrame oluşturmadan)
+            df = pd.DataFrame({
+                'timestamp': pd.to_datetime(list(data.keys())),
+                'open': np.fromiter((bar['1. open'] for bar in bars), dtype=np.float64, count=n),
+                'high': np.fromiter((bar['2. high'] for bar in bars), dtype=np.float64, count=n),
+                'low': np.fromiter((bar['3. low'] for bar in bars), dtype=np.float64, count=n),
+                'close': np.fromiter((bar['4. close'] for bar in bars), dtype=np.float64, count=n),
+                'volume': np.fromiter((bar['5. volume'] for bar in bars), dtype=np.float64, count=n)
+            })
             self.logger.info(f"AlphaVantage'den {symbol} verisi çekildi.", "ALPHAVANTAGE_FETCHER") # <-- Günlükleme mesajı
-            return df.reset_index().rename(columns={'index': 'timestamp'})
+            return df
             
         except Exception as e:
             self.logger.error(f"AlphaVantage fetch error for {symbol}: {str(e)}", "ALPHAVANTAGE_FETCHER") # <-- Günlükleme mesajı
@@ -108,15 +181,18 @@ class DataFetcher:
         #         'apikey': API_KEYS['twelvedata'],
         #         'outputsize': 500
         #     }
-        #     response = requests.get(url, params=params)
+        #     response = self.session.get(url, params=params)
         #     response.raise_for_status()
         #     self._update_api_counter('twelvedata')
-        #     data = response.json()['values']
-        #     df = pd.DataFrame(data)
-        #     df['datetime'] = pd.to_datetime(df['datetime'])
-        #     df = df.rename(columns={'datetime': 'timestamp'})
+        #     bars = orjson.loads(response.content)['values']
+        #     n = len(bars)
+        #     df = pd.DataFrame({
+        #         'timestamp': pd.to_datetime([bar['datetime'] for bar in bars]),
+        #         **{col: np.fromiter((bar[col] for bar in bars), dtype=np.float64, count=n)
+        #            for col in ('open', 'high', 'low', 'close', 'volume')}
+        #     })
         #     self.logger.info(f"TwelveData'dan {symbol} verisi çekildi.", "TWELVEDATA_FETCHER")
-        #     return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+        #     return df
         # except Exception as e:
         #     self.logger.error(f"TwelveData fetch error for {symbol}: {str(e)}", "TWELVEDATA_FETCHER")
         #     return None
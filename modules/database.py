@@ -0,0 +1,174 @@
+# modules/database.py
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # DuckDB opsiyonel; yoksa pandas.read_sql kullanılır
+    duckdb = None
+
+DB_PATH = 'data/database.db'
+
+# Zaman damgası sütunlarının SQLite'a yazıldığı metin biçimi (to_sql ile aynı)
+SQLITE_TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+_local = threading.local()
+# SQLite yazıcıları zaten sıralar; sınıflar arası ortak kilit "database is locked" hatalarını önler
+write_lock = threading.RLock()
+
+_duck_conns = {}
+_duck_lock = threading.Lock()
+
+def _duck_cursor(db_path: str):
+    """SQLite dosyasını ATTACH etmiş DuckDB bağlantısından yeni bir cursor döndürür"""
+    with _duck_lock:
+        if db_path not in _duck_conns:
+            try:
+                conn = duckdb.connect()
+                conn.execute(f"ATTACH '{db_path}' AS sqlite_db (TYPE SQLITE, READ_ONLY)")
+                conn.execute("USE sqlite_db")
+            except duckdb.Error:
+                # sqlite eklentisi yüklenemedi (ör. çevrimdışı); bu dosya için DuckDB'yi devre dışı bırak
+                conn = None
+            _duck_conns[db_path] = conn
+        conn = _duck_conns[db_path]
+    return conn.cursor() if conn is not None else None
+
+def read_frame(query: str, conn, db_path: str, params: tuple = (), index_col: str = None,
+               parse_dates: list = None, chunksize: int = None) -> pd.DataFrame:
+    """
+    SELECT sorgusunu DataFrame olarak döndürür.
+    DuckDB kuruluysa SQLite dosyası doğrudan taranır; değilse sqlite3 bağlantısı ile
+    (chunksize verilmişse parça parça) okunur. Yazma işlemleri her zaman sqlite3
+    bağlantısı üzerinden yapılmalıdır.
+    """
+    if duckdb is not None:
+        cursor = _duck_cursor(db_path)
+        if cursor is not None:
+            try:
+                df = cursor.execute(query, list(params)).fetch_df()
+                for column in parse_dates or []:
+                    df[column] = pd.to_datetime(df[column])
+                return df.set_index(index_col) if index_col else df
+            except duckdb.Error:
+                pass  # Tablo henüz yok vb. durumlarda sqlite3 yoluna düş
+            finally:
+                cursor.close()
+
+    if chunksize is None:
+        return pd.read_sql(query, conn, params=params, index_col=index_col, parse_dates=parse_dates)
+    chunks = list(pd.read_sql(query, conn, params=params, index_col=index_col,
+                              parse_dates=parse_dates, chunksize=chunksize))
+    return pd.concat(chunks) if chunks else pd.DataFrame()
+
+# Salt okunur bağlantılar günlük modunu değiştiremez; WAL dosyada kalıcıdır ve yazıcı bağlantılar açar
+READ_ONLY_PRAGMAS = SQLITE_PRAGMAS[2:] + ("PRAGMA query_only=ON",)
+
+def apply_pragmas(conn) -> None:
+    """WAL günlüğü ve gevşetilmiş senkronizasyon ayarlarını bağlantıya uygular"""
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+
+def get_conn(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    İş parçacığına özel, paylaşılan SQLite bağlantısını döndürür.
+    Bağlantı autocommit modundadır (isolation_level=None); yazmalar transaction() ile yapılmalıdır.
+    """
+    conns = getattr(_local, 'conns', None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        apply_pragmas(conn)
+        conns[db_path] = conn
+    return conn
+
+def get_read_conn(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """
+    İş parçacığına özel, salt okunur (mode=ro) SQLite bağlantısını döndürür.
+    WAL modunda okuyucular yazıcıyı beklemez; arayüzün okuma sorguları için kullanılır.
+    """
+    conns = getattr(_local, 'read_conns', None)
+    if conns is None:
+        conns = _local.read_conns = {}
+    conn = conns.get(db_path)
+    if conn is None:
+        # WAL'ın açık olduğundan emin ol (yazıcı bağlantı pragmaları uygular)
+        get_conn(db_path)
+        conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False,
+                               isolation_level=None)
+        for pragma in READ_ONLY_PRAGMAS:
+            conn.execute(pragma)
+        conns[db_path] = conn
+    return conn
+
+@contextmanager
+def transaction(conn):
+    """Ortak yazma kilidi altında açık BEGIN/COMMIT bloğu; hata durumunda ROLLBACK yapar"""
+    with write_lock:
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        else:
+            # to_sql kendi commit'ini çağırmış olabilir
+            if conn.in_transaction:
+                conn.execute("COMMIT")
+
+@lru_cache(maxsize=32)
+def _insert_sql(table: str, columns: tuple, replace: bool = False) -> str:
+    """Tablo ve sütunlar için INSERT ifadesini bir kez oluşturur"""
+    verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+    column_list = ', '.join(f'"{c}"' for c in columns)
+    placeholders = ', '.join('?' * len(columns))
+    return f'{verb} INTO "{table}" ({column_list}) VALUES ({placeholders})'
+
+def _sqlite_rows(df: pd.DataFrame):
+    """
+    Satırları sqlite3'ün bağlayabileceği tiplerle üretir (datetime -> 'YYYY-MM-DD HH:MM:SS', NaT -> NULL).
+    Biçim değer başına sabittir; UNIQUE indeks ve filigran karşılaştırmaları aynı metne dayanır.
+    """
+    columns = []
+    for _, column in df.items():
+        if pd.api.types.is_datetime64_any_dtype(column):
+            column = column.dt.strftime(SQLITE_TIMESTAMP_FORMAT).where(column.notna(), None)
+        columns.append(column)
+    return zip(*columns)
+
+def ensure_table(conn, table: str, df: pd.DataFrame) -> bool:
+    """Tablo yoksa DataFrame şemasıyla (to_sql ile aynı DDL) oluşturur; oluşturulduysa True döner"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)
+    ).fetchone()
+    if exists is not None:
+        return False
+    conn.execute(pd.io.sql.get_schema(df, table, con=conn))
+    return True
+
+def write_frame(conn, table: str, df: pd.DataFrame, replace: bool = False) -> None:
+    """
+    DataFrame satırlarını executemany ile tabloya yazar.
+    Açık bir transaction() bloğu içinde çağrılmalıdır; replace=True ise INSERT OR REPLACE kullanılır.
+    """
+    ensure_table(conn, table, df)
+    conn.executemany(_insert_sql(table, tuple(df.columns), replace), _sqlite_rows(df))
+
+def insert_frame(conn, table: str, df: pd.DataFrame, replace: bool = False) -> None:
+    """DataFrame satırlarını tek bir transaction içinde tabloya ekler"""
+    with transaction(conn):
+        write_frame(conn, table, df, replace)
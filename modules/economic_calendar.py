@@ -1,16 +1,24 @@
 # modules/economic_calendar.py
+import time
 import requests
+import numpy as np
 import pandas as pd
-import sqlite3
 from datetime import datetime, timedelta
 from config import API_KEYS
 from .logger import Logger
+from .database import DB_PATH, get_conn, read_frame, transaction
 from typing import Dict, List
 
+# Yüksek riskli etkinlik sayılarının önbellekte tutulma süresi (saniye)
+EVENT_COUNT_TTL = 60
+
 class EconomicCalendar:
     def __init__(self):
         self.logger = Logger(log_file='logs/app_log.json')
-        self.conn = sqlite3.connect('data/database.db')
+        self.db_path = DB_PATH
+        self.conn = get_conn(self.db_path)
+        # (para birimi, eşik) -> (etkinlik sayısı, time.monotonic() zamanı)
+        self._event_count_cache = {}
         self.base_url = "https://financialmodelingprep.com/api/v3/economic_calendar"
         self.headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
 
@@ -48,52 +56,65 @@ class EconomicCalendar:
     def _parse_events(self, raw_data: List[Dict]) -> pd.DataFrame:
         """Ham veriyi işlenebilir DataFrame'e dönüştürür"""
         df = pd.DataFrame(raw_data)[['event', 'date', 'country', 'importance', 'actual', 'previous', 'change']]
-        df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None)
-        df['currency'] = df['country'].apply(lambda x: x.split(' ')[-1])
-        df['hours_to_event'] = (df['date'] - pd.Timestamp.now()).dt.total_seconds() / 3600
+        # FMP tarihleri UTC ve sabit formatlıdır; format vermek çıkarımı atlar, cache tekrar eden değerleri bir kez çözer
+        df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d %H:%M:%S', cache=True, utc=True).dt.tz_localize(None)
+        df['currency'] = df['country'].str.rsplit(' ', n=1).str[-1]
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        df['hours_to_event'] = (df['date'].to_numpy() - now.to_datetime64()) / np.timedelta64(1, 'h')
         return df.dropna()
 
     def _calculate_event_risk(self, df: pd.DataFrame) -> pd.DataFrame:
         """Etkinlik risk skorunu hesaplar (0-10 arası)"""
-        importance_map = {'High': 3, 'Medium': 2, 'Low': 1}
-        df['importance_score'] = df['importance'].map(importance_map)
+        # Low=1, Medium=2, High=3; bilinmeyen önem seviyeleri NaN kalır
+        importance_codes = pd.Categorical(df['importance'], categories=['Low', 'Medium', 'High']).codes
+        importance_score = np.where(importance_codes >= 0, importance_codes + 1, np.nan)
         
         # Risk formülü: (Önem * 3) + (Volatilite * 2) - (Süre * 0.5)
-        df['volatility_score'] = abs(df['change'].fillna(0) / 100) # % cinsinden değişim
-        df['time_score'] = df['hours_to_event'].apply(lambda x: max(0, 24 - x)/24)  # 24 saat içindeki etkinlikler
+        volatility_score = np.abs(df['change'].fillna(0).to_numpy(dtype=np.float64)) / 100 # % cinsinden değişim
+        time_score = np.maximum(24 - df['hours_to_event'].to_numpy(dtype=np.float64), 0) / 24  # 24 saat içindeki etkinlikler
         
-        df['risk_score'] = (
-            (df['importance_score'] * 3) +
-            (df['volatility_score'] * 2) +
-            (df['time_score'] * 0.5)
-        ).round(2)
+        risk_score = np.multiply(importance_score, 3)
+        risk_score += np.multiply(volatility_score, 2, out=volatility_score)
+        risk_score += np.multiply(time_score, 0.5, out=time_score)
+        np.round(risk_score, 2, out=risk_score)
+        df['risk_score'] = risk_score
         
         # Risk seviyesi kategorilendirme
-        df['risk_level'] = pd.cut(df['risk_score'],
+        df['risk_level'] = pd.cut(risk_score,
                                bins=[0, 3, 6, 10],
-                               labels=['Low', 'Medium', 'High'])
+                               labels=['Low', 'Medium', 'High'],
+                               include_lowest=True)
         
         return df[['event', 'date', 'currency', 'risk_score', 'risk_level', 'actual', 'previous']]
 
     def _save_to_database(self, df: pd.DataFrame) -> None:
         """Verileri SQLite veritabanına kaydeder"""
         try:
-            df.to_sql('economic_calendar', self.conn, 
-                     if_exists='replace', index=False)
-            self.conn.commit()
+            with transaction(self.conn):
+                df.to_sql('economic_calendar', self.conn, 
+                         if_exists='replace', index=False)
+            self._event_count_cache.clear()  # Tablo yenilendi; önbellekteki sayılar geçersiz
             self.logger.info(f"Saved {len(df)} economic events to database")
         except Exception as e:
             self.logger.error(f"Database save error: {str(e)}")
-            self.conn.rollback()
 
     def get_high_risk_events(self, threshold: float = 6.0) -> pd.DataFrame:
         """Risk skoru threshold üstündeki etkinlikleri getirir"""
-        query = f"SELECT * FROM economic_calendar WHERE risk_score >= {threshold}"
-        return pd.read_sql(query, self.conn)
+        query = "SELECT * FROM economic_calendar WHERE risk_score >= ?"
+        return read_frame(query, self.conn, self.db_path, params=(threshold,))
 
-    def __del__(self):
-        """Veritabanı bağlantısını kapat"""
-        self.conn.close()
+    def count_high_risk_events(self, currency: str, threshold: float = 6.0) -> int:
+        """Para birimi için risk skoru threshold üstündeki etkinlik sayısını SQL'de sayar (EVENT_COUNT_TTL önbellekli)"""
+        key = (currency, threshold)
+        cached = self._event_count_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < EVENT_COUNT_TTL:
+            return cached[0]
+        count = self.conn.execute(
+            "SELECT COUNT(*) FROM economic_calendar WHERE currency=? AND risk_score >= ?",
+            (currency, threshold)
+        ).fetchone()[0]
+        self._event_count_cache[key] = (count, time.monotonic())
+        return count
 
 # Örnek kullanım
 if __name__ == "__main__":
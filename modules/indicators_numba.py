@@ -0,0 +1,190 @@
+# modules/indicators_numba.py
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba opsiyonel; yoksa çekirdek saf Python/NumPy olarak çalışır
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+BB_WINDOW = 20
+RSI_WINDOW = 14
+
+# Durum vektöründeki alanların indeksleri
+_SEEN = 0         # İşlenen çubuk sayısı
+_MEAN = 1         # Bollinger penceresinin ortalaması
+_M2 = 2           # Bollinger penceresinin kare sapma toplamı
+_EMA12 = 3
+_EMA26 = 4
+_EMA_SIGNAL = 5
+_GAIN_SUM = 6     # Son 14 farkın kazanç toplamı
+_LOSS_SUM = 7     # Son 14 farkın kayıp toplamı
+_PREV_CLOSE = 8
+_HA_OPEN = 9      # Önceki Heikin-Ashi açılışı
+_HA_CLOSE = 10    # Önceki Heikin-Ashi kapanışı
+_STATE_SIZE = 11
+
+class IndicatorState:
+    """
+    Göstergelerin çubuklar arasında taşınan sabit boyutlu durumu.
+    Yeni çubuklar geldiğinde tüm geçmişi yeniden işlemek yerine yalnızca yeni çubuklar beslenir.
+    """
+    __slots__ = ('values', 'close_window', 'diff_window')
+
+    def __init__(self):
+        self.values = np.zeros(_STATE_SIZE, dtype=np.float64)
+        self.close_window = np.zeros(BB_WINDOW, dtype=np.float64)  # Son 20 kapanış (halka tampon)
+        self.diff_window = np.zeros(RSI_WINDOW, dtype=np.float64)  # Son 14 fark (halka tampon)
+
+    def copy(self) -> 'IndicatorState':
+        clone = IndicatorState.__new__(IndicatorState)
+        clone.values = self.values.copy()
+        clone.close_window = self.close_window.copy()
+        clone.diff_window = self.diff_window.copy()
+        return clone
+
+@njit(cache=True, error_model='numpy')
+def _indicator_scan(close, open_, high, low, state, close_window, diff_window):
+    """
+    Göstergeleri verilen durumdan başlayarak tek geçişte hesaplar; durum yerinde güncellenir.
+    Sonuçlar pandas karşılıklarıyla aynıdır: rolling(20).mean/std, ewm(adjust=False) ve
+    rolling(14) ortalamalı RSI; ısınma bölgesi NaN döner.
+    Heikin-Ashi açılışı gerçek özyinelemeyi izler: ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2.
+    """
+    n = close.shape[0]
+    ma20 = np.empty(n, dtype=np.float64)
+    stddev = np.empty(n, dtype=np.float64)
+    upper_band = np.empty(n, dtype=np.float64)
+    lower_band = np.empty(n, dtype=np.float64)
+    ema12 = np.empty(n, dtype=np.float64)
+    ema26 = np.empty(n, dtype=np.float64)
+    macd = np.empty(n, dtype=np.float64)
+    macd_signal = np.empty(n, dtype=np.float64)
+    rsi = np.empty(n, dtype=np.float64)
+    ha_open = np.empty(n, dtype=np.float64)
+    ha_close = np.empty(n, dtype=np.float64)
+
+    alpha12 = 2.0 / 13.0
+    alpha26 = 2.0 / 27.0
+    alpha9 = 2.0 / 10.0
+
+    seen = int(state[_SEEN])
+    mean = state[_MEAN]
+    m2 = state[_M2]
+    e12 = state[_EMA12]
+    e26 = state[_EMA26]
+    e_signal = state[_EMA_SIGNAL]
+    gain_sum = state[_GAIN_SUM]
+    loss_sum = state[_LOSS_SUM]
+    prev_close = state[_PREV_CLOSE]
+    prev_ha_open = state[_HA_OPEN]
+    prev_ha_close = state[_HA_CLOSE]
+
+    for i in range(n):
+        x = np.float64(close[i])
+
+        # Bollinger: kayan pencere Welford; pencere doluysa 20 çubuk önceki kapanış çıkarılır
+        slot = seen % BB_WINDOW
+        if seen < BB_WINDOW:
+            count = seen + 1
+            delta_mean = x - mean
+            mean += delta_mean / count
+            m2 += delta_mean * (x - mean)
+        else:
+            count = BB_WINDOW
+            old = close_window[slot]
+            new_mean = mean + (x - old) / BB_WINDOW
+            m2 += (x - old) * (x - new_mean + old - mean)
+            mean = new_mean
+        close_window[slot] = x
+        if count == BB_WINDOW:
+            sd = np.sqrt(max(m2, 0.0) / (BB_WINDOW - 1))
+            ma20[i] = mean
+            stddev[i] = sd
+            upper_band[i] = mean + 2.0 * sd
+            lower_band[i] = mean - 2.0 * sd
+        else:
+            ma20[i] = np.nan
+            stddev[i] = np.nan
+            upper_band[i] = np.nan
+            lower_band[i] = np.nan
+
+        # MACD: adjust=False üstel ortalamalar ilk değerden başlar
+        if seen == 0:
+            e12 = x
+            e26 = x
+            e_signal = 0.0
+        else:
+            e12 += alpha12 * (x - e12)
+            e26 += alpha26 * (x - e26)
+            e_signal += alpha9 * ((e12 - e26) - e_signal)
+        ema12[i] = e12
+        ema26[i] = e26
+        macd[i] = e12 - e26
+        macd_signal[i] = e_signal
+
+        # RSI: ilk farkın kazanç/kaybı 0 sayılır (pandas'taki where(..., 0) davranışı);
+        # 14 çubuk önceki fark aynı halka yuvasından çıkarılır
+        d = x - prev_close if seen > 0 else 0.0
+        slot = seen % RSI_WINDOW
+        if seen >= RSI_WINDOW:
+            old = diff_window[slot]
+            if old > 0:
+                gain_sum = max(gain_sum - old, 0.0)
+            elif old < 0:
+                loss_sum = max(loss_sum + old, 0.0)
+        diff_window[slot] = d
+        if d > 0:
+            gain_sum += d
+        elif d < 0:
+            loss_sum -= d
+        if seen >= RSI_WINDOW - 1:
+            rsi[i] = 100.0 - 100.0 / (1.0 + (gain_sum / RSI_WINDOW) / (loss_sum / RSI_WINDOW))
+        else:
+            rsi[i] = np.nan
+
+        # Heikin-Ashi: ilk mum kendi açılış/kapanış ortalamasından başlar
+        o = np.float64(open_[i])
+        hc = 0.25 * (o + np.float64(high[i]) + np.float64(low[i]) + x)
+        ho = 0.5 * (o + x) if seen == 0 else 0.5 * (prev_ha_open + prev_ha_close)
+        ha_close[i] = hc
+        ha_open[i] = ho
+
+        prev_close = x
+        prev_ha_open = ho
+        prev_ha_close = hc
+        seen += 1
+
+    # Özyinelemesiz HA uçları tek geçişli dizi indirgemesi (Numba yoksa da vektörel kalır)
+    ha_high = np.maximum(np.maximum(high.astype(np.float64), ha_open), ha_close)
+    ha_low = np.minimum(np.minimum(low.astype(np.float64), ha_open), ha_close)
+
+    state[_SEEN] = seen
+    state[_MEAN] = mean
+    state[_M2] = m2
+    state[_EMA12] = e12
+    state[_EMA26] = e26
+    state[_EMA_SIGNAL] = e_signal
+    state[_GAIN_SUM] = gain_sum
+    state[_LOSS_SUM] = loss_sum
+    state[_PREV_CLOSE] = prev_close
+    state[_HA_OPEN] = prev_ha_open
+    state[_HA_CLOSE] = prev_ha_close
+
+    return (ma20, stddev, upper_band, lower_band, ema12, ema26, macd, macd_signal, rsi,
+            ha_open, ha_close, ha_high, ha_low)
+
+def compute_indicators_from(state: IndicatorState, close, open_, high, low) -> tuple:
+    """Göstergeleri state'in kaldığı yerden hesaplar; state yeni çubukları içerecek şekilde güncellenir"""
+    return _indicator_scan(close, open_, high, low, state.values, state.close_window, state.diff_window)
+
+def compute_indicators(close, open_, high, low) -> tuple:
+    """Tüm fiyat geçmişi için göstergeleri sıfır durumdan hesaplar"""
+    return compute_indicators_from(IndicatorState(), close, open_, high, low)
+
+def _warmup() -> None:
+    """JIT derleme maliyetini içe aktarma sırasında bir kez öder"""
+    dummy = np.linspace(1.0, 2.0, 128, dtype=np.float32)  # SignalGenerator float32 girdi kullanır
+    compute_indicators(dummy, dummy, dummy, dummy)
+
+_warmup()
@@ -1,16 +1,34 @@
 import logging
-import json
+import logging.handlers
+import atexit
+import queue
+import time
 from datetime import datetime
-import threading
 from typing import Dict, Optional
 
+try:
+    import orjson
+
+    def _dumps(data: Dict) -> str:
+        # orjson UTF-8 çıktı üretir (ensure_ascii=False karşılığı) ve datetime'ı doğrudan serileştirir
+        return orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+except ImportError:  # orjson kurulu değilse stdlib json kullanılır
+    import json
+
+    def _dumps(data: Dict) -> str:
+        return json.dumps(data, ensure_ascii=False,
+                          default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+
 class Logger:
     """
     Uygulama genelinde standartlaştırılmış ve JSON formatında loglama sağlayan sınıf.
+    Kayıtlar bir kuyruğa bırakılır; dosya/konsol yazımı arka plan QueueListener iş parçacığında yapılır.
     """
+    _listener: Optional[logging.handlers.QueueListener] = None # Tüm Logger örnekleri için ortak dinleyici
+    _alert_enabled: bool = False # _check_for_alert yalnızca uyarı mantığı doldurulduğunda çağrılır
+
     def __init__(self, log_file: str = 'app_log.json'):
         self.log_file = log_file
-        self.lock = threading.Lock() # Günlük yazma sırasında eşzamanlı erişimi yönetmek için kilit
         self.logger = logging.getLogger('TradingAppLogger')
         self.logger.setLevel(logging.INFO) # Varsayılan log seviyesi INFO
 
@@ -18,67 +36,95 @@ class Logger:
         self._setup_logger()
 
     def _setup_logger(self):
-        # Logger'a handler'ların zaten eklenip eklenmediğini kontrol et
+        # Logger'a handler'ların zaten eklenip eklenmediğini kontrol et.
+        # Aynı isimli logger paylaşıldığından sonraki Logger örnekleri yeni handler (ve dosya tanıtıcısı) açmaz.
         if not self.logger.handlers:
             # Dosya handler'ı: Logları belirtilen dosyaya yazar
-            file_handler = logging.FileHandler(self.log_file)
-            file_handler.setFormatter(JSONFormatter()) # Özel JSON formatlayıcıyı kullan
-            self.logger.addHandler(file_handler)
+            file_handler = BufferedFileHandler(self.log_file)
+            file_handler.setFormatter(JSONFormatter()) # Özel JSON formatlayıcıyı kullan (dinleyici iş parçacığında çalışır)
 
             # İsteğe bağlı: Konsol çıktısı için StreamHandler (geliştirme sırasında faydalıdır)
             stream_handler = logging.StreamHandler()
             stream_handler.setFormatter(logging.Formatter('%(levelname)s: %(message)s'))
-            self.logger.addHandler(stream_handler)
 
-    def log(self, level: str, message: str, module: str, extra: Optional[Dict] = None) -> None:
+            # Çağıran iş parçacığı yalnızca kuyruğa yazar; disk G/Ç'si arka planda yapılır
+            log_queue = queue.Queue(-1)
+            self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
+            Logger._listener = FlushingQueueListener(
+                log_queue, file_handler, stream_handler, respect_handler_level=True,
+                flush_interval=file_handler.flush_interval
+            )
+            Logger._listener.start()
+            atexit.register(Logger._stop_listener)
+
+    @classmethod
+    def _stop_listener(cls) -> list:
+        """Kuyruktaki kayıtları boşaltır ve dinleyiciyi durdurur; handler'ları döndürür"""
+        listener = cls._listener
+        if listener is None:
+            return []
+        cls._listener = None
+        listener.stop()
+        return list(listener.handlers)
+
+    def log(self, level: str, message: str, module: Optional[str] = None, *args,
+            extra: Optional[Dict] = None) -> None:
         """
         Özelleştirilmiş JSON log kaydı oluşturur.
 
         Args:
             level (str): Log seviyesi (örn: 'INFO', 'WARNING', 'ERROR', 'CRITICAL').
-            message (str): Log mesajı.
-            module (str): Logu oluşturan özel modül adı (örn: 'DATA_FETCHER', 'RISK_MANAGER').
+            message (str): Log mesajı; %-biçim yer tutucuları içerebilir.
+            module (Optional[str]): Logu oluşturan özel modül adı (örn: 'DATA_FETCHER', 'RISK_MANAGER').
+            *args: Mesajdaki yer tutucuların değerleri; seviye filtrelenmişse biçimlendirme hiç yapılmaz.
             extra (Optional[Dict]): Log kaydına eklenecek ek anahtar-değer çiftleri.
         """
+        levelno = getattr(logging, level.upper())
+        if not self.logger.isEnabledFor(levelno):
+            return # Filtrelenen seviyelerde kayıt ve extra sözlüğü hiç oluşturulmaz
+
         # LogRecord'a eklenecek özel nitelikler için bir sözlük oluştur.
         # Standart 'module' niteliğiyle çakışmayı önlemek için benzersiz bir anahtar kullanıyoruz.
-        log_record_extra = {'custom_module_name': module}
+        log_record_extra = {'custom_module_name': module} if module else {}
 
         if extra:
             log_record_extra.update(extra) # Çağıran tarafından sağlanan diğer 'extra' verilerini birleştir
 
-        with self.lock: # Aynı anda yalnızca bir iş parçacığının log yazmasını sağla
-            try:
-                # Standart Python günlükleme metodunu çağır.
-                # 'message' mesaj olarak, 'level' günlükleme seviyesi olarak geçirilir.
-                # 'extra' sözlüğü, LogRecord'a eklenecek özel nitelikleri içerir.
-                self.logger.log(getattr(logging, level.upper()), message, extra=log_record_extra)
+        try:
+            # Standart Python günlükleme metodunu çağır (QueueHandler iş parçacığı güvenlidir, kilit gerekmez).
+            # Not: QueueHandler.prepare() kaydı kuyruğa koymadan önce çağıran iş parçacığında biçimlendirir;
+            # 'message' ve 'args' burada birleştirilir. Tek tembellik yukarıdaki isEnabledFor kontrolüdür.
+            # 'extra' sözlüğü, LogRecord'a eklenecek özel nitelikleri içerir; JSON'a dönüştürme dinleyicide yapılır.
+            self.logger.log(levelno, message, *args, extra=log_record_extra)
+            if self._alert_enabled:
                 self._check_for_alert(log_record_extra) # Uyarı kontrolü yap
-            except Exception as e:
-                print(f"Logging failed: {str(e)}") # Günlükleme hatasını konsola yaz
+        except Exception as e:
+            print(f"Logging failed: {str(e)}") # Günlükleme hatasını konsola yaz
 
-    def debug(self, message: str, module: str, extra: Optional[Dict] = None) -> None:
-        self.log('DEBUG', message, module, extra)
+    def debug(self, message: str, module: Optional[str] = None, *args, extra: Optional[Dict] = None) -> None:
+        self.log('DEBUG', message, module, *args, extra=extra)
 
-    def info(self, message: str, module: str, extra: Optional[Dict] = None) -> None:
-        self.log('INFO', message, module, extra)
+    def info(self, message: str, module: Optional[str] = None, *args, extra: Optional[Dict] = None) -> None:
+        self.log('INFO', message, module, *args, extra=extra)
 
-    def warning(self, message: str, module: str, extra: Optional[Dict] = None) -> None:
-        self.log('WARNING', message, module, extra)
+    def warning(self, message: str, module: Optional[str] = None, *args, extra: Optional[Dict] = None) -> None:
+        self.log('WARNING', message, module, *args, extra=extra)
 
-    def error(self, message: str, module: str, extra: Optional[Dict] = None) -> None:
-        self.log('ERROR', message, module, extra)
+    def error(self, message: str, module: Optional[str] = None, *args, extra: Optional[Dict] = None) -> None:
+        self.log('ERROR', message, module, *args, extra=extra)
 
-    def critical(self, message: str, module: str, extra: Optional[Dict] = None) -> None:
-        self.log('CRITICAL', message, module, extra)
+    def critical(self, message: str, module: Optional[str] = None, *args, extra: Optional[Dict] = None) -> None:
+        self.log('CRITICAL', message, module, *args, extra=extra)
 
     def shutdown(self):
         """
         Tüm logger handler'larını temizler ve kapatır.
         Uygulama düzgün bir şekilde kapatıldığında çağrılmalıdır.
         """
-        self.logger.info("Günlükleme sistemi kapatılıyor ve dosyalar temizleniyor.", "LOGGER_SHUTDOWN")
-        for handler in self.logger.handlers[:]: # Liste üzerinde dönerken değiştirmemek için kopyasını kullan
+        self.info("Günlükleme sistemi kapatılıyor ve dosyalar temizleniyor.", "LOGGER_SHUTDOWN")
+        # Önce kuyruktaki kayıtların dinleyici tarafından yazılmasını bekle
+        listener_handlers = Logger._stop_listener()
+        for handler in self.logger.handlers[:] + listener_handlers: # Liste üzerinde dönerken değiştirmemek için kopyasını kullan
             handler.flush() # Tamponlanmış tüm logları diske yaz
             handler.close() # Handler'ı kapat
             self.logger.removeHandler(handler) # Logger'dan handler'ı kaldır
@@ -95,6 +141,77 @@ class Logger:
         #     print(f"CRITICAL UYARI: {log_data.get('message')}")
         pass # Şu an için boş bırakıldı
 
+# JSON çıktısına eklenmeyecek standart LogRecord nitelikleri (ve zaten işlenen 'custom_module_name')
+_RESERVED_RECORD_KEYS = frozenset({
+    'name', 'levelname', 'pathname', 'filename', 'lineno', 'funcName', 'created',
+    'asctime', 'msecs', 'relativeCreated', 'thread', 'threadName', 'processName', 'process',
+    'exc_info', 'exc_text', 'stack_info', 'msg', 'args', 'module', 'custom_module_name'
+})
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    Kuyruk flush_interval saniye boş kaldığında handler'ları boşaltan QueueListener.
+    Böylece uygulama boştayken son kayıtlar yeni bir kayıt gelmesini beklemeden diske yazılır.
+    """
+    def __init__(self, queue, *handlers, respect_handler_level: bool = False, flush_interval: float = 1.0):
+        super().__init__(queue, *handlers, respect_handler_level=respect_handler_level)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool):
+        if not block:
+            return self.queue.get(block)
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+class BufferedFileHandler(logging.Handler):
+    """
+    Kayıtları 64 KB tamponlu bir dosyaya yazan handler.
+    Disk boşaltma her kayıtta değil; flush_records kayıtta bir, ERROR ve üzeri seviyedeki kayıtlarda
+    hemen, aksi halde en geç flush_interval saniye sonra (kayıt gelmese de FlushingQueueListener ile) yapılır.
+    """
+    def __init__(self, filename: str, flush_records: int = 100, flush_interval: float = 1.0):
+        super().__init__()
+        self.stream = open(filename, 'ab', buffering=1 << 16)
+        self.flush_records = flush_records
+        self.flush_interval = flush_interval
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self.stream.write((self.format(record) + '\n').encode('utf-8'))
+            self._pending += 1
+            if (record.levelno >= logging.ERROR
+                    or self._pending >= self.flush_records
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self.flush()
+        except Exception:
+            self.handleError(record)
+
+    def flush(self) -> None:
+        self.acquire()
+        try:
+            if self._pending and not self.stream.closed:
+                self.stream.flush()
+            self._pending = 0
+            self._last_flush = time.monotonic()
+        finally:
+            self.release()
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            if not self.stream.closed:
+                self.stream.flush()
+                self.stream.close()
+        finally:
+            self.release()
+        super().close()
+
 class JSONFormatter(logging.Formatter):
     """
     Log kayıtlarını JSON formatına dönüştüren özel formatlayıcı.
@@ -102,7 +219,7 @@ class JSONFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         # Log verisi sözlüğünü JSON çıktısı için oluştur
         log_data = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(), # LogRecord'dan standart zaman damgası
+            'timestamp': datetime.fromtimestamp(record.created), # LogRecord'dan standart zaman damgası (serileştirici ISO formatına çevirir)
             'level': record.levelname, # LogRecord'dan standart seviye adı
             # Özel modül adımızı tercih et, yoksa standart record.module'u (log çağrısının yapıldığı modül) kullan
             'module': getattr(record, 'custom_module_name', record.module),
@@ -111,12 +228,8 @@ class JSONFormatter(logging.Formatter):
 
         # Log metodunda 'extra' dict aracılığıyla geçirilen diğer özel nitelikleri ekle
         # Bu nitelikler LogRecord objesinin doğrudan nitelikleri haline gelir.
-        for key, value in record.__dict__.items():
-            # Standart LogRecord niteliklerini ve bizim zaten işlediğimiz 'custom_module_name'i dışarıda bırak
-            # Ayrıca içsel/özel Python niteliklerini (alt çizgi ile başlayanlar) de dışarıda bırak
-            if key not in ['name', 'levelname', 'pathname', 'filename', 'lineno', 'funcName', 'created',
-                           'asctime', 'msecs', 'relativeCreated', 'thread', 'threadName', 'processName', 'process',
-                           'exc_info', 'exc_text', 'stack_info', 'msg', 'args', 'module', 'custom_module_name'] and not key.startswith('_'):
-                log_data[key] = value
-
-        return json.dumps(log_data, ensure_ascii=False) # JSON formatında döndür
\ No newline at end of file
+        # Standart nitelikler ve alt çizgi ile başlayan içsel nitelikler dışarıda bırakılır.
+        log_data.update({key: value for key, value in record.__dict__.items()
+                         if key not in _RESERVED_RECORD_KEYS and key[0] != '_'})
+
+        return _dumps(log_data) # JSON formatında döndür
\ No newline at end of file
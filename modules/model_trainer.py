@@ -1,45 +1,102 @@
 # modules/model_trainer.py
+import os
 import optuna
 import xgboost as xgb
 import shap
 import pandas as pd
 import numpy as np
-import sqlite3
 import joblib
+from functools import lru_cache
+import matplotlib.pyplot as plt
+import torch
 from sklearn.model_selection import TimeSeriesSplit
 from sklearn.metrics import mean_squared_error, classification_report
 from .logger import Logger
+from .database import DB_PATH, get_conn
+
+# SHAP özet grafiği için kullanılacak en fazla satır sayısı
+SHAP_SAMPLE_SIZE = 5000
+
+# load_data'nın cleaned_data tablosunu okurken kullandığı parça boyutu
+LOAD_CHUNK_SIZE = 50_000
+
+# İlerleme yüzdesinde "bitmiş" sayılan Optuna deneme durumları
+FINISHED_TRIAL_STATES = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED,
+                         optuna.trial.TrialState.FAIL)
+
+# Tüm XGBoost eğitimlerinde ortak: histogram tabanlı ağaç kurulumu, GPU varsa CUDA
+XGB_BASE_PARAMS = {
+    'tree_method': 'hist',
+    'device': 'cuda' if torch.cuda.is_available() else 'cpu',
+}
+
+# Eşzamanlı Optuna denemesi sayısı; tek GPU'yu denemeler arasında paylaştırmamak için CUDA'da 1
+OPTUNA_N_JOBS = 1 if XGB_BASE_PARAMS['device'] == 'cuda' else max(1, (os.cpu_count() or 2) // 2)
+# Deneme başına XGBoost iş parçacığı; toplam iş parçacığı sayısı çekirdek sayısını aşmaz
+XGB_TRIAL_THREADS = max(1, (os.cpu_count() or 1) // OPTUNA_N_JOBS)
+
+@lru_cache(maxsize=16)
+def _load_artifact(path: str, mtime: float):
+    """Pickle dosyasını yükler; anahtardaki mtime sayesinde yeniden eğitilen dosya otomatik yeniden okunur"""
+    return joblib.load(path)
 
 class ModelTrainer:
     def __init__(self, commodity: str, logger: Logger = None):
         self.commodity = commodity
         self.logger = logger or Logger()
-        self.conn = sqlite3.connect('data/database.db')
+        self.db_path = DB_PATH
         self.best_params = None
         self.feature_importance = None
         self.shap_explainer = None
 
+    @property
+    def conn(self):
+        """İş parçacığına özel veritabanı bağlantısı"""
+        return get_conn(self.db_path)
+
+    def load_model(self) -> xgb.XGBClassifier:
+        """Kaydedilmiş XGBoost modelini döndürür (dosya değişmedikçe önbellekten)"""
+        path = f'models/xgboost_model_{self.commodity}.pkl'
+        return _load_artifact(path, os.path.getmtime(path))
+
+    def load_shap_explainer(self):
+        """Kaydedilmiş SHAP explainer'ını döndürür (dosya değişmedikçe önbellekten)"""
+        path = f'models/shap_explainer_{self.commodity}.pkl'
+        return _load_artifact(path, os.path.getmtime(path))
+
     def load_data(self) -> tuple:
         """Veritabanından temizlenmiş verileri yükler"""
         try:
+            # Sabit 'commodity' sütunu SQL'de projeksiyonla dışarıda bırakılır
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(cleaned_data)")
+                       if row[1] != 'commodity']
+            column_list = ', '.join(f'"{c}"' for c in columns)
             query = f"""
-                SELECT * FROM cleaned_data 
-                WHERE commodity='{self.commodity}'
+                SELECT {column_list} FROM cleaned_data 
+                WHERE commodity=?
                 ORDER BY timestamp
             """
-            df = pd.read_sql(query, self.conn)
+            
+            # Parça parça oku ve her parçadaki float sütunları float32'ye daralt;
+            # tüm tablo hiçbir zaman float64 olarak bellekte iki kez bulunmaz
+            chunks = []
+            for chunk in pd.read_sql(query, self.conn, params=(self.commodity,),
+                                     chunksize=LOAD_CHUNK_SIZE):
+                float_cols = chunk.select_dtypes('float64').columns.difference(['signal'])
+                chunks.append(chunk.astype(dict.fromkeys(float_cols, np.float32)))
+            df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=columns)
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             df.set_index('timestamp', inplace=True)
             
             # Özellikler ve hedef değişken
-            X = df.drop(['signal', 'commodity'], axis=1)
+            X = df.drop(columns='signal')
             y = df['signal']  # 1: Long, 0: Short
             
-            self.logger.info(f"Loaded {len(X)} samples for {self.commodity}")
+            self.logger.info("Loaded %d samples for %s", "MODEL_TRAINER", len(X), self.commodity)
             return X, y
             
         except Exception as e:
-            self.logger.error(f"Data loading failed: {str(e)}", "MODEL_TRAINER")
+            self.logger.error("Data loading failed: %s", "MODEL_TRAINER", e)
             return None, None
 
     def objective(self, trial: optuna.Trial, X: pd.DataFrame, y: pd.Series) -> float:
@@ -56,16 +113,22 @@ class ModelTrainer:
             'subsample': trial.suggest_float('subsample', 0.5, 1.0),
             'colsample_bytree': trial.suggest_float('colsample_bytree', 0.5, 1.0),
             'min_child_weight': trial.suggest_int('min_child_weight', 1, 10),
+            'n_jobs': XGB_TRIAL_THREADS,
+            **XGB_BASE_PARAMS,
         }
         
         tscv = TimeSeriesSplit(n_splits=5)
         scores = []
         
-        for train_idx, val_idx in tscv.split(X):
+        for fold, (train_idx, val_idx) in enumerate(tscv.split(X)):
             X_train, X_val = X.iloc[train_idx], X.iloc[val_idx]
             y_train, y_val = y.iloc[train_idx], y.iloc[val_idx]
             
-            model = xgb.XGBClassifier(**params)
+            # Doğrulama kaybı 20 tur iyileşmezse eğitim durur, en iyi tur korunur
+            model = xgb.XGBClassifier(
+                **params,
+                callbacks=[xgb.callback.EarlyStopping(rounds=20, save_best=True)]
+            )
             model.fit(X_train, y_train,
                       eval_set=[(X_val, y_val)],
                       verbose=False)
@@ -73,26 +136,46 @@ class ModelTrainer:
             preds = model.predict_proba(X_val)[:, 1]
             rmse = mean_squared_error(y_val, preds, squared=False)
             scores.append(rmse)
+            
+            # Ara skoru bildir; medyanın gerisinde kalan denemeler kalan katlar beklenmeden kesilir
+            trial.report(np.mean(scores), fold)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
         
         return np.mean(scores)
 
-    def optimize_hyperparameters(self, X: pd.DataFrame, y: pd.Series, n_trials: int = 100) -> dict:
-        """Hiperparametre optimizasyonu çalıştır"""
-        study = optuna.create_study(direction='minimize')
-        study.optimize(lambda trial: self.objective(trial, X, y), n_trials=n_trials)
+    def optimize_hyperparameters(self, X: pd.DataFrame, y: pd.Series, n_trials: int = 100,
+                                 progress=None) -> dict:
+        """
+        Hiperparametre optimizasyonu çalıştır.
+        progress verilirse (ör. multiprocessing.Value('d')), her deneme sonunda .value alanına
+        tamamlanma yüzdesi yazılır; arayüz bu değeri kendi hızında okur.
+        """
+        callbacks = []
+        if progress is not None:
+            def report_progress(study, trial):
+                finished = len(study.get_trials(deepcopy=False, states=FINISHED_TRIAL_STATES))
+                progress.value = 100.0 * finished / n_trials
+            callbacks.append(report_progress)
+
+        study = optuna.create_study(direction='minimize', pruner=optuna.pruners.MedianPruner())
+        study.optimize(lambda trial: self.objective(trial, X, y), n_trials=n_trials,
+                       n_jobs=OPTUNA_N_JOBS, gc_after_trial=True,
+                       callbacks=callbacks)
         
         self.best_params = study.best_params
-        self.logger.info(f"Optimization completed. Best params: {self.best_params}", "MODEL_TRAINER")
+        self.logger.info("Optimization completed. Best params: %s", "MODEL_TRAINER", self.best_params)
         return study.best_params
 
     def train_final_model(self, X: pd.DataFrame, y: pd.Series) -> xgb.XGBClassifier:
         """Son modeli eğit ve SHAP analizi yap"""
-        model = xgb.XGBClassifier(**self.best_params)
+        model = xgb.XGBClassifier(**self.best_params, **XGB_BASE_PARAMS)
         model.fit(X, y)
         
-        # SHAP analizi
-        explainer = shap.Explainer(model, X)
-        shap_values = explainer(X)
+        # SHAP analizi: ağaç modelleri için yerel TreeExplainer, değerler yalnızca örneklem üzerinde
+        explainer = shap.TreeExplainer(model, feature_perturbation='tree_path_dependent')
+        X_sample = X.sample(min(SHAP_SAMPLE_SIZE, len(X)), random_state=0)
+        shap_values = explainer.shap_values(X_sample)
         
         # Özellik önemini kaydet
         self.feature_importance = pd.DataFrame({
@@ -105,7 +188,7 @@ class ModelTrainer:
         joblib.dump(explainer, f'models/shap_explainer_{self.commodity}.pkl')
         
         # Görselleştirme
-        shap.summary_plot(shap_values, X, show=False)
+        shap.summary_plot(shap_values, X_sample, show=False)
         plt.savefig(f'models/shap_summary_{self.commodity}.png')
         plt.close()
         
@@ -123,7 +206,7 @@ class ModelTrainer:
             'f1': report['weighted avg']['f1-score']
         }
         
-        self.logger.info(f"Model evaluation: {metrics}", "MODEL_TRAINER")
+        self.logger.info("Model evaluation: %s", "MODEL_TRAINER", metrics)
         return metrics
 
     def full_pipeline(self) -> bool:
@@ -1,26 +1,50 @@
 # modules/online_learning.py
-import sqlite3
+import os
 import pandas as pd
 import numpy as np
 import joblib
+import xgboost as xgb
 from datetime import datetime, timedelta
+from functools import lru_cache
 from river import compose, linear_model, preprocessing, drift
 from .logger import Logger
+from .database import DB_PATH, get_conn
+
+@lru_cache(maxsize=16)
+def _load_booster(path: str, mtime: float) -> xgb.Booster:
+    """Model dosyasının ham Booster'ını yükler; anahtardaki mtime sayesinde yeniden eğitilen dosya yeniden okunur"""
+    return joblib.load(path).get_booster()
+
+def _load_xgb(commodity: str) -> xgb.Booster:
+    """Emtianın güncel XGBoost Booster'ını döndürür (dosya değişmedikçe önbellekten)"""
+    path = f'models/xgboost_model_{commodity}.pkl'
+    return _load_booster(path, os.path.getmtime(path))
 
 class OnlineLearner:
     def __init__(self, commodity: str, logger: Logger = None):
         self.commodity = commodity
         self.logger = logger or Logger()
-        self.conn = sqlite3.connect('data/database.db')
+        self.db_path = DB_PATH
         
         # Model ve drift dedektörü
         self.model = self._init_online_model()
         self.drift_detector = drift.ADWIN()
         self.last_train_time = datetime.now()
         
-        # Önceden eğitilmiş XGBoost modeli
-        self.base_model = joblib.load(f'models/xgboost_model_{commodity}.pkl')
-        
+        # Önceden eğitilmiş XGBoost modeli (aynı emtia için örnekler arasında paylaşılır);
+        # ilk yükleme burada, yeniden eğitim sonrası güncel dosya base_model özelliğiyle alınır
+        _load_xgb(commodity)
+
+    @property
+    def base_model(self) -> xgb.Booster:
+        """Diskteki model değişmişse (yeniden eğitim) yeni Booster'ı döndürür"""
+        return _load_xgb(self.commodity)
+
+    @property
+    def conn(self):
+        """Yeni veri sorguları için iş parçacığına özel bağlantı"""
+        return get_conn(self.db_path)
+
     def _init_online_model(self):
         """River pipeline'ını oluştur"""
         return compose.Pipeline(
@@ -30,24 +54,20 @@ class OnlineLearner:
     
     def _fetch_new_data(self, last_timestamp: datetime) -> pd.DataFrame:
         """Son kayıttan itibaren yeni verileri çek"""
-        query = f"""
+        query = """
             SELECT * FROM cleaned_data 
-            WHERE commodity='{self.commodity}' 
-            AND timestamp > '{last_timestamp}'
+            WHERE commodity=? 
+            AND timestamp > ?
             ORDER BY timestamp
         """
-        return pd.read_sql(query, self.conn)
-    
-    def _preprocess_for_river(self, X: pd.Series) -> dict:
-        """Pandas Series'ı River formatına dönüştür"""
-        return X.to_dict()
+        return pd.read_sql(query, self.conn, params=(self.commodity, str(last_timestamp)))
     
-    def _predict_and_learn(self, X: dict, y: float) -> None:
-        """Online modeli güncelle"""
-        self.model = self.model.learn_one(X, y)
+    def _predict_and_learn(self, X: dict, y: float, online_pred: float) -> None:
+        """Online modeli güncelle; drift hatası _hybrid_predict'te hesaplanan tahminden alınır"""
+        self.model.learn_one(X, y)
         
-        # Concept drift kontrolü
-        error = abs(y - self.model.predict_proba_one(X).get(1, 0.5))
+        # Concept drift kontrolü (öğrenmeden önceki tahmin; modeli ikinci kez çağırmaya gerek yok)
+        error = abs(y - online_pred)
         self.drift_detector.update(error)
         
         if self.drift_detector.drift_detected:
@@ -66,12 +86,19 @@ class OnlineLearner:
         self.model = self._init_online_model()
         self.drift_detector.reset()
         
-    def _hybrid_predict(self, X: pd.DataFrame) -> np.ndarray:
-        """XGBoost ve online modelin ensemble tahmini"""
-        online_preds = np.array([self.model.predict_proba_one(self._preprocess_for_river(row))[1] 
-                             for _, row in X.iterrows()])
-        xgb_preds = self.base_model.predict_proba(X)[:, 1]
-        return (online_preds + xgb_preds) / 2
+    def _hybrid_predict(self, X: pd.DataFrame, records: list = None) -> tuple:
+        """Online model ve XGBoost olasılıklarını (online_preds, xgb_preds) olarak döndürür"""
+        if records is None:
+            records = X.to_dict(orient='records')
+        online_preds = np.fromiter(
+            (self.model.predict_proba_one(r).get(1, 0.5) for r in records),
+            dtype=np.float64, count=len(records)
+        )
+        # sklearn sarmalayıcısı yerine doğrudan Booster; float32 bitişik dizi kopyasız aktarılır
+        dmat = xgb.DMatrix(np.ascontiguousarray(X.to_numpy(dtype=np.float32)),
+                           feature_names=list(X.columns))
+        xgb_preds = self.base_model.predict(dmat)
+        return online_preds, xgb_preds
     
     def process_new_data(self, batch_size: int = 100) -> None:
         """Yeni veriler üzerinde online öğrenme uygula"""
@@ -85,13 +112,16 @@ class OnlineLearner:
             X = new_data.drop(['signal', 'commodity', 'timestamp'], axis=1)
             y = new_data['signal']
             
+            # Satırlar bir kez düz dict listesine çevrilir (iterrows'un satır başına Series maliyeti yok)
+            records = X.to_dict(orient='records')
+            
             # Hibrit tahmin yap
-            predictions = self._hybrid_predict(X)
+            online_preds, xgb_preds = self._hybrid_predict(X, records)
+            predictions = (online_preds + xgb_preds) / 2
             
-            # Online modeli güncelle
-            for idx, row in X.iterrows():
-                river_X = self._preprocess_for_river(row)
-                self._predict_and_learn(river_X, y.iloc[idx])
+            # Online modeli güncelle (drift hatası için online tahminler yeniden kullanılır)
+            for river_X, online_pred, target in zip(records, online_preds, y.to_numpy()):
+                self._predict_and_learn(river_X, target, online_pred)
             
             # Modeli periyodik olarak kaydet
             if (datetime.now() - self.last_train_time) > timedelta(hours=1):
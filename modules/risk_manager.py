@@ -1,53 +1,77 @@
 # modules/risk_manager.py
-import sqlite3
 import numpy as np
 import pandas as pd
 from typing import Optional, Tuple
 from .logger import Logger
+from .database import DB_PATH, get_conn
 from .sentiment_analyzer import SentimentAnalyzer
 from .economic_calendar import EconomicCalendar
 
+# Risk skoru sınırları: [0, 0.5) Low, [0.5, 1.5) Medium, [1.5, 3.0] High
+RISK_LEVEL_BOUNDS = np.array([0.5, 1.5])
+RISK_LEVELS = np.array(['Low', 'Medium', 'High'])
+
 class RiskManager:
     def __init__(self, commodity: str, logger: Logger = None):
         self.commodity = commodity
         self.logger = logger or Logger()
-        self.conn = sqlite3.connect('data/database.db')
+        self.db_path = DB_PATH
         self.sentiment_analyzer = SentimentAnalyzer()
         self.economic_calendar = EconomicCalendar()
 
+    @property
+    def conn(self):
+        """Çağıran iş parçacığına ait SQLite bağlantısı (WAL ile okuyucular paralel çalışır)"""
+        return get_conn(self.db_path)
+
+    @staticmethod
+    def kelly(win_prob, win_loss_ratio):
+        """Kelly oranını 0-1 arasına kırparak hesaplar; skaler veya dizi girdileri kabul eder"""
+        win_prob = np.asarray(win_prob, dtype=np.float64)
+        win_loss_ratio = np.asarray(win_loss_ratio, dtype=np.float64)
+        kelly_f = (win_prob * (win_loss_ratio + 1) - 1) / np.maximum(win_loss_ratio, 1e-12)
+        # Geçersiz (p <= 0 veya oran <= 0) girdiler 0 pozisyona düşer
+        kelly_f = np.where((win_prob > 0) & (win_loss_ratio > 0), kelly_f, 0.0)
+        return np.clip(kelly_f, 0.0, 1.0)
+
     def calculate_kelly_position(self, win_prob: float, win_loss_ratio: float) -> float:
         """Kelly Criterion ile pozisyon büyüklüğü hesapla"""
         try:
-            if win_prob <= 0 or win_loss_ratio <= 0:
-                return 0.0
-                
-            kelly_f = (win_prob * (win_loss_ratio + 1) - 1) / win_loss_ratio
-            return max(0.0, min(kelly_f, 1.0))  # 0-1 arasında sınırla
-            
-        except Exception as e:
+            win_prob, win_loss_ratio = float(win_prob), float(win_loss_ratio)
+        except (TypeError, ValueError) as e:
             self.logger.error(f"Kelly calculation failed: {str(e)}", "RISK_MANAGER")
             return 0.0
+        if not np.isfinite(win_prob) or not np.isfinite(win_loss_ratio):
+            self.logger.error("Kelly calculation failed: non-finite input", "RISK_MANAGER")
+            return 0.0
+        return float(self.kelly(win_prob, win_loss_ratio))
 
     def calculate_atr_stop_loss(self, period: int = 14, multiplier: float = 2.0) -> Tuple[float, float]:
         """ATR tabanlı dinamik stop-loss seviyesi"""
         try:
-            query = f"""
+            query = """
                 SELECT high, low, close 
                 FROM cleaned_data 
-                WHERE commodity='{self.commodity}'
+                WHERE commodity=?
                 ORDER BY timestamp DESC 
-                LIMIT {period + 1}
+                LIMIT ?
             """
-            df = pd.read_sql(query, self.conn)
+            df = pd.read_sql(query, self.conn, params=(self.commodity, period + 1))
             
-            high_low = df['high'] - df['low']
-            high_close = (df['high'] - df['close'].shift()).abs()
-            low_close = (df['low'] - df['close'].shift()).abs()
+            # Sorgu en yeniden eskiye sıralı; hesap için kronolojik sıraya çevir
+            high = df['high'].to_numpy(dtype=np.float64)[::-1]
+            low = df['low'].to_numpy(dtype=np.float64)[::-1]
+            close = df['close'].to_numpy(dtype=np.float64)[::-1]
+            prev_close = close[:-1]
             
-            tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-            atr = tr.rolling(period).mean().iloc[-1]
+            tr = np.maximum.reduce([
+                high[1:] - low[1:],
+                np.abs(high[1:] - prev_close),
+                np.abs(low[1:] - prev_close)
+            ])
+            atr = tr[-period:].mean()
             
-            current_price = df['close'].iloc[-1]
+            current_price = close[-1]
             stop_loss_long = current_price - (multiplier * atr)
             stop_loss_short = current_price + (multiplier * atr)
             
@@ -61,14 +85,14 @@ class RiskManager:
         """Kullanıcı tahmininin risk analizini yap"""
         try:
             # Mevcut piyasa verilerini al
-            query = f"""
+            query = """
                 SELECT close, volatility 
                 FROM cleaned_data 
-                WHERE commodity='{self.commodity}'
+                WHERE commodity=?
                 ORDER BY timestamp DESC 
                 LIMIT 1
             """
-            current_data = pd.read_sql(query, self.conn).iloc[0]
+            current_data = pd.read_sql(query, self.conn, params=(self.commodity,)).iloc[0]
             current_price = current_data['close']
             volatility = current_data['volatility']
             
@@ -76,14 +100,8 @@ class RiskManager:
             price_diff = abs(current_price - entry_price)
             risk_score = min(price_diff / (volatility * 2), 3.0)  # 3x volatilite
             
-            # Risk seviyesi
-            if risk_score < 0.5:
-                risk_level = 'Low'
-            elif risk_score < 1.5:
-                risk_level = 'Medium'
-            else:
-                risk_score = min(risk_score, 3.0)  # Maks 3.0
-                risk_level = 'High'
+            # Risk seviyesi: sabit sınır dizisinde ikili arama
+            risk_level = str(RISK_LEVELS[np.searchsorted(RISK_LEVEL_BOUNDS, risk_score, side='right')])
             
             return {
                 'current_price': current_price,
@@ -105,8 +123,7 @@ class RiskManager:
             sentiment_score = self.sentiment_analyzer.get_recent_sentiment(self.commodity, hours=24)
             
             # Yaklaşan yüksek riskli etkinlikler
-            high_risk_events = self.economic_calendar.get_high_risk_events(threshold=6.0)
-            event_risk = len(high_risk_events[high_risk_events['currency'] == self.commodity[:3]])
+            event_risk = self.economic_calendar.count_high_risk_events(self.commodity[:3], threshold=6.0)
             
             # Risk modifikasyon faktörleri
             sentiment_factor = max(0.5, 1.0 - (0.2 * (1.0 - sentiment_score)))  # Duygu 0-1 arası
@@ -1,24 +1,110 @@
 # modules/sentiment_analyzer.py
+import os
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import pandas as pd
-import sqlite3
 import numpy as np
+import torch
 from datetime import datetime, timedelta
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+from functools import lru_cache
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
 from .logger import Logger
+from .database import DB_PATH, get_conn, transaction, write_frame
 from config import API_KEYS
 from typing import List, Dict
 
+try:
+    from onnxruntime import GraphOptimizationLevel, SessionOptions
+    from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:  # ONNX Runtime opsiyonel; yoksa PyTorch modeli kullanılır
+    ORTModelForSequenceClassification = None
+
+ONNX_CACHE_DIR = 'models/onnx'
+# Başlık + özet için yeterli token sınırı (BERT'in 512'sine göre ~4 kat daha az hesap)
+MAX_TOKEN_LENGTH = 128
+# Ortalama duygu skorlarının süreç içi önbellekte tutulma süresi (saniye)
+SENTIMENT_CACHE_TTL = 300
+
+def _load_onnx_model(model_name: str):
+    """Modeli bir kez ONNX'e aktarıp int8 kuantize eder; sonraki açılışlarda diskten yükler"""
+    quantized_dir = os.path.join(ONNX_CACHE_DIR, model_name.replace('/', '_') + '_int8')
+    if not os.path.isdir(quantized_dir):
+        exported = ORTModelForSequenceClassification.from_pretrained(
+            model_name, export=True, provider='CPUExecutionProvider'
+        )
+        quantizer = ORTQuantizer.from_pretrained(exported)
+        qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+        quantizer.quantize(save_dir=quantized_dir, quantization_config=qconfig)
+
+    session_options = SessionOptions()
+    session_options.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+    session_options.intra_op_num_threads = max(1, (os.cpu_count() or 2) // 2)
+    return ORTModelForSequenceClassification.from_pretrained(
+        quantized_dir, file_name='model_quantized.onnx',
+        provider='CPUExecutionProvider', session_options=session_options
+    )
+
+@lru_cache(maxsize=4)
+def _load_finbert(model_name: str) -> tuple:
+    """
+    Tokenizer ve modeli model adı başına bir kez yükler; tüm SentimentAnalyzer örnekleri paylaşır.
+    GPU varsa PyTorch fp16, yoksa (optimum kuruluysa) int8 ONNX Runtime modeli kullanılır.
+    """
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    use_cuda = torch.cuda.is_available()
+    if not use_cuda and ORTModelForSequenceClassification is not None:
+        try:
+            return tokenizer, _load_onnx_model(model_name)
+        except Exception:
+            pass  # Dışa aktarma başarısız (ör. çevrimdışı); PyTorch modeline düş
+    model = AutoModelForSequenceClassification.from_pretrained(
+        model_name, torch_dtype=torch.float16 if use_cuda else torch.float32
+    )
+    return tokenizer, model.to('cuda' if use_cuda else 'cpu').eval()
+
 class SentimentAnalyzer:
     def __init__(self, logger: Logger = None, model_name: str = "ProsusAI/finbert"):
         self.logger = logger or Logger()
-        self.conn = sqlite3.connect('data/database.db')
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
-        self.nlp_pipeline = pipeline("text-classification", 
-                                   model=self.model, 
-                                   tokenizer=self.tokenizer,
-                                   return_all_scores=True)
+        self.db_path = DB_PATH
+        # (emtia, saat) -> (ortalama skor, time.monotonic() zamanı)
+        self._sentiment_cache: Dict[tuple, tuple] = {}
+        # Haber istekleri için kalıcı oturum: TCP/TLS bağlantıları çağrılar arasında yeniden kullanılır
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8,
+                              max_retries=Retry(total=3, backoff_factor=0.2))
+        self.session.mount('https://', adapter)
+        self.tokenizer, self.model = _load_finbert(model_name)
+        self._sentiment_index_ready = False
+        self._ensure_sentiment_index()
+        # Sınıf indeksleri -> etiketler ('positive', 'negative', 'neutral')
+        self.labels = np.array([self.model.config.id2label[i].lower()
+                                for i in range(len(self.model.config.id2label))])
+
+    @property
+    def conn(self):
+        """Çağıran iş parçacığının SQLite bağlantısı"""
+        return get_conn(self.db_path)
+
+    def _ensure_sentiment_index(self) -> None:
+        """
+        news_sentiment üzerinde (commodity, timestamp DESC, positive_score) kapsayıcı indeksini oluşturur;
+        get_recent_sentiment AVG sorgusu tabloya hiç dokunmadan indeks aralığından yanıtlanır.
+        """
+        if self._sentiment_index_ready:
+            return
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='news_sentiment'"
+        ).fetchone()
+        if exists is None:
+            return  # Tablo ilk kayıtta oluşturulur; indeks o zaman eklenir
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_ns_cov ON news_sentiment(commodity, timestamp DESC, positive_score)"
+        )
+        self.conn.execute("ANALYZE news_sentiment")
+        self._sentiment_index_ready = True
 
     def fetch_financial_news(self, commodity: str) -> List[Dict]:
         """AlphaVantage API'den finansal haberleri çek"""
@@ -31,14 +117,14 @@ class SentimentAnalyzer:
                 'limit': 50  # Maksimum desteklenen limit
             }
             
-            response = requests.get(url, params=params, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             response.raise_for_status()
             raw_data = response.json()
             
             return raw_data.get('feed', [])
             
         except Exception as e:
-            self.logger.error(f"News fetch failed: {str(e)}", "SENTIMENT_ANALYZER")
+            self.logger.error("News fetch failed: %s", "SENTIMENT_ANALYZER", e)
             return []
 
     def _preprocess_text(self, text: str) -> str:
@@ -46,62 +132,95 @@ class SentimentAnalyzer:
         text = text[:512]  # BERT maksimum uzunluk
         return text.replace("$", "").replace("\n", " ").strip()
 
-    def analyze_sentiment(self, news_list: List[Dict]) -> pd.DataFrame:
+    def _predict_proba(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """Metinleri tokenizer + model ile doğrudan sınıflandırır; (n, sınıf) olasılık matrisi döndürür"""
+        # Tek seferde dolgusuz tokenize et, token uzunluğuna göre sırala; benzer uzunluktaki
+        # metinler aynı batch'e düştüğünden dolgu token'ları için boşa hesap yapılmaz
+        encoded = self.tokenizer(texts, truncation=True, max_length=MAX_TOKEN_LENGTH)
+        order = np.argsort([len(ids) for ids in encoded['input_ids']], kind='stable')
+        probs = np.empty((len(texts), len(self.labels)), dtype=np.float32)
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                idx = order[start:start + batch_size]
+                batch = self.tokenizer.pad({key: [values[i] for i in idx] for key, values in encoded.items()},
+                                           return_tensors='pt')
+                logits = self.model(**batch.to(self.model.device)).logits
+                # Sonuçlar orijinal haber sırasına geri yazılır
+                probs[idx] = logits.float().softmax(-1).cpu().numpy()
+        return probs
+
+    def analyze_sentiment(self, news_list: List[Dict], batch_size: int = 16) -> pd.DataFrame:
         """Haber listesi üzerinde toplu duygu analizi yap"""
         results = []
+        texts = [self._preprocess_text(news.get('title', '') + ". " + news.get('summary', ''))
+                 for news in news_list]
+        if not texts:
+            return pd.DataFrame(results)
         
-        for news in news_list:
+        try:
+            probs = self._predict_proba(texts, batch_size)
+        except Exception as e:
+            self.logger.warning("News analysis failed: %s", "SENTIMENT_ANALYZER", e)
+            return pd.DataFrame(results)
+        
+        # Etiket sütunları ve baskın duygu tüm haberler için tek seferde çıkarılır
+        scores = {label: probs[:, i] for i, label in enumerate(self.labels)}
+        overall_sentiments = self.labels[probs.argmax(axis=1)]
+        
+        for i, news in enumerate(news_list):
             try:
-                text = self._preprocess_text(news.get('title', '') + ". " + news.get('summary', ''))
-                sentiment_result = self.nlp_pipeline(text)[0]
-                
-                scores = {item['label']: item['score'] for item in sentiment_result}
-                overall_sentiment = max(scores, key=scores.get)
-                
                 news_entry = {
                     'timestamp': pd.to_datetime(news.get('time_published', datetime.utcnow())),
                     'title': news.get('title', ''),
                     'url': news.get('url', ''),
-                    'sentiment': overall_sentiment,
-                    'positive_score': scores['positive'],
-                    'negative_score': scores['negative'],
-                    'neutral_score': scores['neutral'],
+                    'sentiment': overall_sentiments[i],
+                    'positive_score': float(scores['positive'][i]),
+                    'negative_score': float(scores['negative'][i]),
+                    'neutral_score': float(scores['neutral'][i]),
                     'related_tickers': ','.join([item['ticker'] for item in news.get('ticker_sentiment', [])])
                 }
                 
                 results.append(news_entry)
                 
             except Exception as e:
-                self.logger.warning(f"News analysis failed: {str(e)}", "SENTIMENT_ANALYZER")
+                self.logger.warning("News analysis failed: %s", "SENTIMENT_ANALYZER", e)
         
         return pd.DataFrame(results)
 
     def save_to_database(self, df: pd.DataFrame, commodity: str) -> None:
         """Analiz sonuçlarını veritabanına kaydet"""
         try:
-            df['commodity'] = commodity
-            df.to_sql('news_sentiment', self.conn, 
-                     if_exists='append', index=False)
-            self.conn.commit()
-            self.logger.info(f"Saved {len(df)} news entries for {commodity}", "SENTIMENT_ANALYZER")
+            # Tek transaction içinde executemany; hata olursa transaction() ROLLBACK yapar
+            with transaction(self.conn):
+                write_frame(self.conn, 'news_sentiment', df.assign(commodity=commodity))
+                self._ensure_sentiment_index()
+            # Yeni satırlar tüm pencerelerin ortalamasını değiştirir; bu emtianın önbelleğini düşür
+            for key in [k for k in self._sentiment_cache if k[0] == commodity]:
+                del self._sentiment_cache[key]
+            self.logger.info("Saved %d news entries for %s", "SENTIMENT_ANALYZER", len(df), commodity)
         except Exception as e:
-            self.logger.error(f"Database save failed: {str(e)}", "SENTIMENT_ANALYZER")
-            self.conn.rollback()
+            self.logger.error("Database save failed: %s", "SENTIMENT_ANALYZER", e)
 
     def get_recent_sentiment(self, commodity: str, hours: int = 24) -> float:
-        """Son X saatlik ortalama pozitif duygu skorunu getir"""
+        """Son X saatlik ortalama pozitif duygu skorunu getir (SENTIMENT_CACHE_TTL süresince önbellekten)"""
+        key = (commodity, int(hours))
+        cached = self._sentiment_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < SENTIMENT_CACHE_TTL:
+            return cached[0]
         try:
-            query = f"""
+            query = """
                 SELECT AVG(positive_score) as avg_score 
                 FROM news_sentiment 
-                WHERE commodity='{commodity}' 
-                AND timestamp >= datetime('now', '-{hours} hours')
+                WHERE commodity=? 
+                AND timestamp >= datetime('now', ?)
             """
-            result = pd.read_sql(query, self.conn)
-            return result['avg_score'].iloc[0] or 0.5  # Default neutral
+            avg_score = self.conn.execute(query, (commodity, f'-{int(hours)} hours')).fetchone()[0]
+            score = avg_score or 0.5  # Default neutral
+            self._sentiment_cache[key] = (score, time.monotonic())
+            return score
             
         except Exception as e:
-            self.logger.error(f"Sentiment query failed: {str(e)}", "SENTIMENT_ANALYZER")
+            self.logger.error("Sentiment query failed: %s", "SENTIMENT_ANALYZER", e)
             return 0.5
 
     def full_pipeline(self, commodity: str) -> float:
@@ -111,13 +230,10 @@ class SentimentAnalyzer:
             return 0.5
             
         analyzed_df = self.analyze_sentiment(news_data)
+        if analyzed_df.empty:
+            return 0.5
         self.save_to_database(analyzed_df, commodity)
-        
-        return analyzed_df['positive_score'].mean()
-
-    def __del__(self):
-        """Veritabanı bağlantısını kapat"""
-        self.conn.close()
+        return float(np.mean(analyzed_df['positive_score'].to_numpy()))
 
 # Örnek kullanım
 if __name__ == "__main__":
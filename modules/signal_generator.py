@@ -1,121 +1,222 @@
 # modules/signal_generator.py
 import pandas as pd
 import numpy as np
-import sqlite3
 import logging
+import re
+import time
 from datetime import datetime, timedelta
+from functools import lru_cache
 from statsmodels.tsa.stattools import adfuller
 from .logger import Logger
 from .data_cleaner import DataCleaner
 from .model_trainer import ModelTrainer
+from .indicators_numba import IndicatorState, compute_indicators_from
+from .database import DB_PATH, get_conn, get_read_conn, transaction, write_frame
+
+# Tampondaki sinyal sayısı bu değere ulaşınca ya da en eski sinyal SIGNAL_MAX_AGE_SECONDS'tan
+# daha uzun süre beklediğinde tampon tek transaction ile diske yazılır
+SIGNAL_BATCH_SIZE = 10
+SIGNAL_MAX_AGE_SECONDS = 120
+
+# Piyasa rejimi ADF testi yalnızca son çubuklar üzerinde, sabit gecikme sayısıyla yapılır
+REGIME_ADF_WINDOW = 500
+REGIME_ADF_MAXLAG = 10
+
+# ma_cross özelliğinin uzun hareketli ortalama penceresi
+MA_CROSS_WINDOW = 50
+
+# Artımlı gösterge önbelleğinde tutulan tamamlanmış çubuk sayısı: ADF penceresi + özellik ısınması.
+# Gösterge durumu IndicatorState'te taşındığından daha eski çubuklara ihtiyaç yoktur.
+INDICATOR_CACHE_ROWS = REGIME_ADF_WINDOW + MA_CROSS_WINDOW
+
+# SHAP açıklamaları en fazla bu aralıkla (saniye) yeniden hesaplanır; arada son sonuç kullanılır
+SHAP_REFRESH_SECONDS = 300
+
+# generate_features'ın ürettiği model özellikleri (sütun sırası sabittir)
+FEATURE_COLUMNS = ['momentum', 'volatility', 'volume_change', 'ma_cross', 'return_1', 'return_3', 'return_5']
+
+# Zaman dilimi birimleri (pandas kısaltmaları) -> saniye
+_TIMEFRAME_UNITS = {'S': 1, 's': 1, 'T': 60, 'min': 60, 'H': 3600, 'h': 3600, 'D': 86400}
+
+# Ham satırları SQLite içinde zaman kovalarına toplayan OHLCV sorgusu (pencere fonksiyonları, SQLite 3.25+)
+RESAMPLE_QUERY = """
+    WITH bucketed AS (
+        SELECT (CAST(strftime('%s', timestamp) AS INTEGER) / ?) * ? AS bucket,
+               timestamp, open, high, low, close, volume
+        FROM cleaned_data
+        WHERE commodity=? AND timestamp >= ?
+    )
+    SELECT DISTINCT bucket,
+           FIRST_VALUE(open) OVER w AS open,
+           MAX(high) OVER w AS high,
+           MIN(low) OVER w AS low,
+           LAST_VALUE(close) OVER w AS close,
+           SUM(volume) OVER w AS volume
+    FROM bucketed
+    WINDOW w AS (PARTITION BY bucket ORDER BY timestamp
+                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+    ORDER BY bucket
+"""
+
+def _pct_change(values: np.ndarray, periods: int) -> np.ndarray:
+    """pandas pct_change(periods) karşılığı; ilk periods değer NaN"""
+    out = np.full(values.shape[0], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out[periods:] = values[periods:] / values[:-periods] - 1.0
+    return out
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Kümülatif toplam farkıyla rolling(window).mean(); ısınma bölgesi NaN"""
+    out = np.full(values.shape[0], np.nan)
+    if values.shape[0] >= window:
+        csum = np.cumsum(values)
+        out[window - 1:] = (csum[window - 1:] - np.concatenate(([0.0], csum[:-window]))) / window
+    return out
+
+@lru_cache(maxsize=16)
+def _timeframe_seconds(timeframe: str) -> int:
+    """'5T', '60T', '1H', '1D' gibi zaman dilimlerini saniyeye çevirir"""
+    match = re.fullmatch(r'(\d*)\s*([A-Za-z]+)', timeframe.strip())
+    if match is None or match.group(2) not in _TIMEFRAME_UNITS:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    return int(match.group(1) or 1) * _TIMEFRAME_UNITS[match.group(2)]
 
 class SignalGenerator:
     def __init__(self, commodity: str, logger: Logger = None):
         self.commodity = commodity
         self.logger = logger or Logger()
-        self.conn = sqlite3.connect('data/database.db')
+        self.db_path = DB_PATH
+        self.conn = get_conn(self.db_path)  # WAL + synchronous=NORMAL pragmaları uygulanmış bağlantı
+        # Fiyat geçmişi okumaları, veri çekici yazarken kilit beklemeyen salt okunur bağlantıdan yapılır
+        self.read_conn = get_read_conn(self.db_path)
+        self._signal_buffer = []
+        self._buffer_started = 0.0  # Tampondaki en eski sinyalin time.monotonic() zamanı
+        # zaman dilimi -> (tamamlanmış çubuklar + göstergeler, o çubukları kapsayan IndicatorState)
+        self._indicator_cache = {}
+        # (son iki çubuğun zaman damgası, ADF p-değeri); yeni çubuk gelmediyse test tekrarlanmaz
+        self._adf_cache = (None, None)
+        # zaman dilimi -> (son SHAP hesabının time.monotonic() zamanı, en etkili özellikler)
+        self._shap_cache = {}
         self.data_cleaner = DataCleaner()
         self.model_trainer = ModelTrainer(commodity)
 
-    def load_historical_data(self, timeframe: str = '5T') -> pd.DataFrame:
-        """Temizlenmiş verileri zaman dilimine göre yükle"""
+    def load_historical_data(self, timeframe: str = '5T', since: str = '') -> pd.DataFrame:
+        """Temizlenmiş verileri zaman dilimine göre yükle (since verilirse yalnızca o andan itibaren)"""
         try:
-            query = f"""
-                SELECT * FROM cleaned_data 
-                WHERE commodity='{self.commodity}'
-                ORDER BY timestamp
-            """
-            df = pd.read_sql(query, self.conn)
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
-            df.set_index('timestamp', inplace=True)
-            
-            # Zaman dilimine göre resample
-            ohlc_dict = {
-                'open': 'first',
-                'high': 'max',
-                'low': 'min',
-                'close': 'last',
-                'volume': 'sum'
-            }
-            return df.resample(timeframe).apply(ohlc_dict).dropna()
+            # Zaman dilimine göre resample SQL'de yapılır; yalnızca OHLCV sütunları ve kova başına tek satır okunur
+            bucket_sec = _timeframe_seconds(timeframe)
+            # read_sql'in genel tip çıkarımı yerine ham cursor; sütunların hepsi sayısal.
+            # Boş since tüm metin zaman damgalarından küçüktür, yani tüm geçmişi seçer.
+            cursor = self.read_conn.execute(RESAMPLE_QUERY, (bucket_sec, bucket_sec, self.commodity, since))
+            columns = [d[0] for d in cursor.description]
+            df = pd.DataFrame.from_records(cursor.fetchall(), columns=columns)
+            df.index = pd.to_datetime(df.pop('bucket'), unit='s').rename('timestamp')
+            return df.dropna()
             
         except Exception as e:
             self.logger.error(f"Data loading failed: {str(e)}", "SIGNAL_GENERATOR")
             return pd.DataFrame()
 
+    def _add_indicators(self, df: pd.DataFrame, state: IndicatorState) -> pd.DataFrame:
+        """Gösterge sütunlarını state'in kaldığı yerden hesaplayıp df'e ekler; state ilerletilir"""
+        # Bollinger Bantları, MACD, RSI ve Heikin-Ashi tek Numba geçişinde hesaplanır
+        # Girdiler bitişik float32 dizilere daraltılır (bellek trafiği yarıya iner); birikimler float64'tür
+        close, open_, high, low = (np.ascontiguousarray(df[col].to_numpy(), dtype=np.float32)
+                                   for col in ('close', 'open', 'high', 'low'))
+        (df['ma20'], df['stddev'], df['upper_band'], df['lower_band'],
+         df['ema12'], df['ema26'], df['macd'], df['signal'], df['rsi'],
+         df['ha_open'], df['ha_close'], df['ha_high'], df['ha_low']) = compute_indicators_from(
+            state, close, open_, high, low
+        )
+        return df
+
     def calculate_technical_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """Teknik göstergeleri hesapla"""
-        # Bollinger Bantları
-        df['ma20'] = df['close'].rolling(20).mean()
-        df['stddev'] = df['close'].rolling(20).std()
-        df['upper_band'] = df['ma20'] + (df['stddev'] * 2)
-        df['lower_band'] = df['ma20'] - (df['stddev'] * 2)
-        
-        # MACD
-        df['ema12'] = df['close'].ewm(span=12, adjust=False).mean()
-        df['ema26'] = df['close'].ewm(span=26, adjust=False).mean()
-        df['macd'] = df['ema12'] - df['ema26']
-        df['signal'] = df['macd'].ewm(span=9, adjust=False).mean()
-        
-        # RSI
-        delta = df['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        df['rsi'] = 100 - (100 / (1 + (gain / loss)))
-        
-        # Heikin-Ashi
-        df['ha_close'] = (df['open'] + df['high'] + df['low'] + df['close']) / 4
-        ha_open = (df['open'].shift(1) + df['close'].shift(1)) / 2
-        df['ha_open'] = ha_open
-        df['ha_high'] = df[['high', 'ha_open', 'ha_close']].max(axis=1)
-        df['ha_low'] = df[['low', 'ha_open', 'ha_close']].min(axis=1)
-        
-        return df.dropna()
+        return self._add_indicators(df, IndicatorState()).dropna()
+
+    def _indicator_frame(self, timeframe: str) -> pd.DataFrame:
+        """
+        Göstergeli çubuk geçmişini artımlı olarak günceller.
+        Yalnızca son tamamlanmış çubuktan sonraki kovalar okunur ve gösterge durumu bu çubuklarla ilerletilir;
+        son (henüz kapanmamış olabilecek) çubuk durumun kopyasıyla hesaplanır ve bir sonraki turda yeniden okunur.
+        """
+        cached = self._indicator_cache.get(timeframe)
+        if cached is None:
+            complete, state = None, IndicatorState()
+            bars = self.load_historical_data(timeframe)
+        else:
+            complete, state = cached
+            next_bucket = complete.index[-1] + pd.Timedelta(seconds=_timeframe_seconds(timeframe))
+            bars = self.load_historical_data(timeframe, since=str(next_bucket))
+        if bars.empty:
+            return complete if complete is not None else bars
+
+        closed = self._add_indicators(bars.iloc[:-1].copy(), state)
+        last = self._add_indicators(bars.iloc[-1:].copy(), state.copy())
+        if complete is not None:
+            closed = pd.concat([complete, closed])
+        # Önbellek sınırlı tutulur; tur başına kopyalama ve özellik hesabı geçmiş uzunluğundan bağımsızdır
+        closed = closed.iloc[-INDICATOR_CACHE_ROWS:]
+        if not closed.empty:
+            self._indicator_cache[timeframe] = (closed, state)
+        return pd.concat([closed, last])
 
     def detect_market_regime(self, df: pd.DataFrame) -> str:
         """Piyasa rejimini belirle (Trending/Range-bound)"""
-        # ADF Testi ile stationarity kontrolü
-        adf_result = adfuller(df['close'])
+        # ADF Testi ile stationarity kontrolü; tüm geçmiş ve AIC ile gecikme seçimi yerine son pencere
+        key = tuple(df.index[-2:])
+        cached_key, p_value = self._adf_cache
+        if cached_key != key:
+            tail = df['close'].iloc[-REGIME_ADF_WINDOW:].to_numpy(dtype=np.float64)
+            p_value = adfuller(tail, maxlag=REGIME_ADF_MAXLAG, autolag=None, regression='c')[1]
+            self._adf_cache = (key, p_value)
         
         # Bollinger Bantları daralma kontrolü
         bandwidth = (df['upper_band'].iloc[-1] - df['lower_band'].iloc[-1]) / df['ma20'].iloc[-1]
         
-        if adf_result[1] < 0.05 and bandwidth < 0.1:
+        if p_value < 0.05 and bandwidth < 0.1:
             return "Range-bound"
         else:
             return "Trending"
 
     def generate_features(self, df: pd.DataFrame) -> pd.DataFrame:
         """ML modeli için özellik mühendisliği"""
-        df['momentum'] = df['close'].pct_change(periods=5)
-        df['volatility'] = df['close'].rolling(20).std()
-        df['volume_change'] = df['volume'].pct_change()
-        df['ma_cross'] = (df['ma20'] > df['ma50']).astype(int)
+        # Özellikler tek bir float32 matriste hesaplanır ve DataFrame'e tek seferde eklenir
+        close = df['close'].to_numpy(dtype=np.float64)
+        features = np.empty((len(df), len(FEATURE_COLUMNS)), dtype=np.float32)
+        features[:, 0] = _pct_change(close, 5)                           # momentum
+        features[:, 1] = df['stddev'].to_numpy()                         # volatility: rolling(20).std() Numba çekirdeğinde
+        features[:, 2] = _pct_change(df['volume'].to_numpy(dtype=np.float64), 1)  # volume_change
+        features[:, 3] = df['ma20'].to_numpy() > _rolling_mean(close, MA_CROSS_WINDOW)  # ma_cross
         
         # Lag özellikleri
-        for lag in [1, 3, 5]:
-            df[f'return_{lag}'] = df['close'].pct_change(lag)
+        for column, lag in enumerate([1, 3, 5], start=4):
+            features[:, column] = _pct_change(close, lag)
             
+        df = pd.concat([df, pd.DataFrame(features, index=df.index, columns=FEATURE_COLUMNS)], axis=1)
         return df.dropna()
 
     def generate_signals(self, timeframe: str = '5T') -> dict:
         """Tüm sinyal üretim pipeline'ını çalıştır"""
         try:
-            raw_df = self.load_historical_data(timeframe)
-            if raw_df.empty:
+            # Göstergeler önbellekteki durumdan yalnızca yeni çubuklar için hesaplanır
+            df = self._indicator_frame(timeframe)
+            if df.empty:
                 return {}
                 
-            df = self.calculate_technical_indicators(raw_df)
-            df = self.generate_features(df)
+            df = self.generate_features(df.dropna())
             
             # Model tahmini
             model = self.model_trainer.load_model()
             features = df.drop(['commodity', 'signal'], axis=1, errors='ignore')
-            df['prediction'] = model.predict_proba(features)[:, 1]
+            # Sinyal yalnızca son çubuğa bağlı; tüm geçmiş yerine tek satır tahmin edilir.
+            # DataFrame olarak verilir ki XGBoost sütun adı/sırası doğrulamasını yapmaya devam etsin.
+            last_features = features.iloc[[-1]].astype(np.float32)
+            probability = float(model.predict_proba(last_features)[0, 1])
             
             # Sinyal oluşturma
             last_row = df.iloc[-1]
-            signal = "Long" if last_row['prediction'] > 0.7 else "Short" if last_row['prediction'] < 0.3 else "Hold"
+            signal = "Long" if probability > 0.7 else "Short" if probability < 0.3 else "Hold"
             
             # Piyasa rejimi
             regime = self.detect_market_regime(df)
@@ -123,17 +224,21 @@ class SignalGenerator:
             # Risk seviyesi
             risk_level = "High" if last_row['volatility'] > 0.03 else "Medium" if last_row['volatility'] > 0.015 else "Low"
             
-            # SHAP açıklamaları
-            explainer = self.model_trainer.load_shap_explainer()
-            shap_values = explainer.shap_values(features.iloc[-1:])
-            top_features = pd.Series(shap_values[0], index=features.columns).abs().nlargest(3).index.tolist()
+            # SHAP açıklamaları (her turda değil, SHAP_REFRESH_SECONDS aralıkla)
+            now = time.monotonic()
+            shap_ts, top_features = self._shap_cache.get(timeframe, (0.0, []))
+            if not top_features or now - shap_ts > SHAP_REFRESH_SECONDS:
+                explainer = self.model_trainer.load_shap_explainer()
+                shap_values = explainer.shap_values(last_features)
+                top_features = pd.Series(shap_values[0], index=features.columns).abs().nlargest(3).index.tolist()
+                self._shap_cache[timeframe] = (now, top_features)
             
             return {
                 'timestamp': datetime.now().isoformat(),
                 'commodity': self.commodity,
                 'timeframe': timeframe,
                 'signal': signal,
-                'probability': round(last_row['prediction'], 2),
+                'probability': round(probability, 2),
                 'regime': regime,
                 'risk_level': risk_level,
                 'price': round(last_row['close'], 4),
@@ -145,17 +250,38 @@ class SignalGenerator:
             return {}
 
     def save_signals_to_db(self, signal_data: dict) -> bool:
-        """Sinyalleri veritabanına kaydet"""
+        """Sinyali tampona ekler; tampon SIGNAL_BATCH_SIZE'a ulaşınca ya da çok bekleyince veritabanına yazar"""
+        if not signal_data:
+            return False
+        # SQLite liste bağlayamaz; özellik adları virgülle birleştirilir
+        row = dict(signal_data, top_features=','.join(signal_data.get('top_features', [])))
+        now = time.monotonic()
+        if not self._signal_buffer:
+            self._buffer_started = now
+        self._signal_buffer.append(row)
+        if (len(self._signal_buffer) >= SIGNAL_BATCH_SIZE
+                or now - self._buffer_started >= SIGNAL_MAX_AGE_SECONDS):
+            return self.flush_signals()
+        return True
+
+    def flush_signals(self) -> bool:
+        """Tampondaki tüm sinyalleri tek BEGIN/executemany/COMMIT ile kaydeder"""
+        if not self._signal_buffer:
+            return True
         try:
-            df = pd.DataFrame([signal_data])
-            df.to_sql('signals', self.conn, if_exists='append', index=False)
-            self.conn.commit()
+            with transaction(self.conn):
+                write_frame(self.conn, 'signals', pd.DataFrame(self._signal_buffer))
+            self._signal_buffer.clear()
             return True
         except Exception as e:
+            # Satırlar tamponda kalır; bir sonraki flush yeniden dener
             self.logger.error(f"Signal save failed: {str(e)}", "SIGNAL_GENERATOR")
-            self.conn.rollback()
             return False
 
+    def close(self) -> None:
+        """Kapanışta tamponda bekleyen sinyalleri yazar"""
+        self.flush_signals()
+
 # Örnek kullanım
 if __name__ == "__main__":
     logger = Logger(log_file='logs/app_log.json')
@@ -167,4 +293,5 @@ if __name__ == "__main__":
     print(signal)
     
     # Veritabanına kaydet
-    sg.save_signals_to_db(signal)
\ No newline at end of file
+    sg.save_signals_to_db(signal)
+    sg.close()
\ No newline at end of file
@@ -2,9 +2,14 @@
 import tkinter as tk
 from tkinter import ttk
 from matplotlib.figure import Figure
+import matplotlib.dates as mdates
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+import numpy as np
 import pandas as pd
 
+# Grafiğin sağ kenarında yeni çubuklar için bırakılan boşluk (görünen zaman aralığına oranla)
+X_RIGHT_PAD = 0.1
+
 class DarkTheme:
     """Tema ayarları için renk paleti"""
     BG = "#2d2d2d"
@@ -31,26 +36,73 @@ class GrafikBileseni(ttk.Frame):
         self.ax = self.fig.add_subplot(111)
         self.ax.set_facecolor(DarkTheme.BG)
         self.ax.tick_params(colors=DarkTheme.FG)
+        self.ax.xaxis_date()
+        self.ax.grid(color=DarkTheme.FG, alpha=0.1)
+        
+        # Renk ayarları
+        for spine in self.ax.spines.values():
+            spine.set_color(DarkTheme.FG)
+        
+        # Çizgi ve bant bir kez oluşturulur, güncellemelerde yalnızca verileri değişir.
+        # animated=True: tam çizimde arka plana girmezler, blit ile üstüne çizilirler
+        self._line, = self.ax.plot([], [], color=DarkTheme.ACCENT, linewidth=1, animated=True)
+        self._fill = None
+        self._bg = None
         
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # Her tam çizimden (ilk gösterim, yeniden boyutlandırma, eksen değişimi) sonra arka planı yakala
+        self.canvas.mpl_connect('draw_event', self._on_draw)
         
-    def update_grafik(self, df: pd.DataFrame, title: str):
-        """Yeni verilerle grafiği güncelle"""
-        self.ax.clear()
+    def _on_draw(self, event):
+        """Tam çizim sonrası eksen arka planını saklar ve hareketli çizimleri üstüne çizer"""
+        self._bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        self._draw_artists()
         
-        # Grafik çizimleri
-        self.ax.plot(df.index, df['close'], color=DarkTheme.ACCENT, linewidth=1)
-        self.ax.fill_between(df.index, df['upper_band'], df['lower_band'], 
-                           color=DarkTheme.ACCENT, alpha=0.2)
-        self.ax.set_title(title, color=DarkTheme.FG)
-        self.ax.grid(color=DarkTheme.FG, alpha=0.1)
+    def _draw_artists(self):
+        if self._fill is not None:
+            self.ax.draw_artist(self._fill)
+        self.ax.draw_artist(self._line)
         
-        # Renk ayarları
-        for spine in self.ax.spines.values():
-            spine.set_color(DarkTheme.FG)
-            
-        self.canvas.draw()
+    def update_grafik(self, df: pd.DataFrame, title: str):
+        """Yeni verilerle grafiği güncelle"""
+        if df.empty:
+            return
+        x = mdates.date2num(df.index.to_pydatetime())
+        close = df['close'].to_numpy()
+        upper = df['upper_band'].to_numpy()
+        lower = df['lower_band'].to_numpy()
+        
+        self._line.set_data(x, close)
+        if self._fill is not None:
+            self._fill.remove()
+        self._fill = self.ax.fill_between(x, upper, lower, color=DarkTheme.ACCENT, alpha=0.2, animated=True)
+        
+        # Eksen sınırları veya başlık değişirse tik etiketleri de değişir; tam çizim gerekir.
+        # Sınırlar veri görünümden taşana kadar sabit kalır: sağ kenarda boşluk bırakılır ve
+        # yalnızca son çubuk bu kenarı geçince, fiyat dikey sınırları aşınca ya da başlık (seri)
+        # değişince yeniden hesaplanır. Böylece olağan turlar blit yolundan geçer.
+        title_changed = title != self.ax.get_title()
+        y_min = min(np.nanmin(close), np.nanmin(lower))
+        y_max = max(np.nanmax(close), np.nanmax(upper))
+        (x_left, x_right), (y_low, y_high) = self.ax.get_xlim(), self.ax.get_ylim()
+        needs_full_draw = self._bg is None
+        if title_changed or x[0] < x_left or x[-1] > x_right or y_min < y_low or y_max > y_high:
+            span = max(x[-1] - x[0], 1e-9)
+            self.ax.set_xlim(x[0], x[-1] + X_RIGHT_PAD * span)
+            pad = 0.05 * (y_max - y_min)
+            self.ax.set_ylim(y_min - pad, y_max + pad)
+            needs_full_draw = True
+        if title_changed:
+            self.ax.set_title(title, color=DarkTheme.FG)
+        
+        if needs_full_draw:
+            self.canvas.draw_idle()
+            return
+        # Yalnızca eksen alanını yeniden çiz: saklanan arka plan + çizgi ve bant
+        self.canvas.restore_region(self._bg)
+        self._draw_artists()
+        self.canvas.blit(self.ax.bbox)
 
 class HaberPaneli(ttk.Frame):
     """Finansal haberleri gösteren interaktif tablo"""
@@ -1,7 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox
-import threading
+import queue
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Projenizdeki diğer modülleri import edin
 from modules.data_fetcher import DataFetcher
@@ -17,6 +18,9 @@ from modules.economic_calendar import EconomicCalendar
 # from ui.news_display_widget import NewsDisplayWidget
 # ... ve diğerleri
 
+# Arka plan iş parçacığından gelen widget güncellemelerinin ana iş parçacığında uygulanma aralığı (ms)
+QUEUE_DRAIN_INTERVAL = 100
+
 class MainWindow(tk.Tk):
     def __init__(self, logger):
         super().__init__()
@@ -26,7 +30,8 @@ class MainWindow(tk.Tk):
 
         # Uygulama kaynaklarını başlat
         self.data_fetcher = DataFetcher(logger)
-        self.signal_generator = SignalGenerator(logger)
+        # Emtia başına tek SignalGenerator; model, gösterge durumu ve paylaşılan DB bağlantısı turlar arasında korunur
+        self.signal_generators = {}
         self.online_learner = OnlineLearner(logger)
         self.risk_manager = RiskManager(logger)
         self.sentiment_analyzer = SentimentAnalyzer(logger)
@@ -37,6 +42,12 @@ class MainWindow(tk.Tk):
 
         self.update_interval = 5000 # Millisaniye cinsinden güncelleme aralığı (örneğin 5 saniye)
 
+        # Tk iş parçacığı güvenli değildir: arka plan işçisi widget'lara dokunmaz, ("alan", metin)
+        # güncellemelerini bu kuyruğa koyar; _drain_queue bunları ana iş parçacığında uygular
+        self.data_queue = queue.Queue()
+        # Ağır veri toplama işleri için küçük sabit havuz; tur başına yeni iş parçacığı açılmaz
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='ui-update')
+
         # Pencere kapatma protokolünü ayarla
         # Pencere kapatma düğmesine basıldığında on_closing metodunu çağırır
         self.protocol("WM_DELETE_WINDOW", self.on_closing) # <-- BU SATIR EKLENDİ
@@ -49,6 +60,7 @@ class MainWindow(tk.Tk):
         # self.load_initial_data() # Bu satır daha önce belirtildiği gibi sizde yoktu, bu yüzden yorumda bırakıldı.
 
         # self.start_update_cycle() # <-- BU SATIR BURADAN KALDIRILDI ve main.py'de after() ile çağrılıyor
+        self.after(QUEUE_DRAIN_INTERVAL, self._drain_queue)
         self.logger.info("MainWindow başarıyla başlatıldı ve UI hazır.", "MAIN_APP")
 
 
@@ -108,12 +120,35 @@ class MainWindow(tk.Tk):
         # self.log_display_widget = LogDisplayWidget(bottom_frame, self.logger) # Eğer LogDisplayWidget varsa
         # self.log_display_widget.pack(side=tk.RIGHT, padx=10, pady=5)
 
+        # Kuyruktaki güncelleme alanı -> hedef widget
+        self._queue_targets = {
+            'api': self.api_counter_label,
+            'graph': self.graph_label,
+            'news': self.news_label,
+            'signal': self.signal_label,
+            'risk': self.risk_label,
+            'status': self.status_label,
+        }
+
 
     def start_update_cycle(self):
         """
         GUI ve arka plan verilerini periyodik olarak güncelleyen döngüyü başlatır.
         Bu metod, main.py'deki app.after() çağrısı ile mainloop başladıktan sonra çağrılmalıdır.
         """
+        self._tick()
+
+    def _tick(self):
+        """
+        Bir güncelleme turunu iş parçacığı havuzuna gönderir.
+        Sonraki tur, bu tur bittikten sonra _drain_queue tarafından planlanır; böylece turlar
+        üst üste binmez ve birikmiş eski çağrılar oluşmaz.
+        """
+        future = self.executor.submit(self._collect_updates)
+        future.add_done_callback(lambda _: self.data_queue.put(('tick', None)))
+
+    def _collect_updates(self):
+        """Arka plan iş parçacığında çalışır; sonuçları yalnızca data_queue'ya koyar."""
         try:
             self.logger.info("Güncelleme döngüsü başlatıldı.", "MAIN_APP")
             self.update_api_counters()
@@ -125,20 +160,41 @@ class MainWindow(tk.Tk):
         except Exception as e:
             self.logger.error(f"Güncelleme döngüsünde hata: {e}", "MAIN_APP")
             self.update_status(f"Hata: {e}")
-        finally:
-            # Belirlenen aralıkta kendini tekrar çağırmayı planla
-            self.after(self.update_interval, self.start_update_cycle)
+
+    def _drain_queue(self):
+        """Kuyruktaki tüm güncellemeleri ana iş parçacığında uygular; alan başına yalnızca sonuncusu çizilir."""
+        latest = {}
+        try:
+            while True:
+                target, text = self.data_queue.get_nowait()
+                latest[target] = text
+        except queue.Empty:
+            pass
+        # Tur tamamlandı: bir sonrakini ana iş parçacığından planla
+        if 'tick' in latest:
+            del latest['tick']
+            self.after(self.update_interval, self._tick)
+        for target, text in latest.items():
+            self._queue_targets[target].config(text=text)
+        self.after(QUEUE_DRAIN_INTERVAL, self._drain_queue)
+
+    def get_signal_generator(self, commodity: str) -> SignalGenerator:
+        """Emtia için SignalGenerator örneğini döndürür; yoksa bir kez oluşturur."""
+        generator = self.signal_generators.get(commodity)
+        if generator is None:
+            generator = self.signal_generators[commodity] = SignalGenerator(commodity, self.logger)
+        return generator
 
     def update_status(self, message: str):
         """Durum çubuğunu günceller."""
-        self.status_label.config(text=f"Durum: {message}")
+        self.data_queue.put(('status', f"Durum: {message}"))
 
     def update_api_counters(self):
         """API çağrı sayaçlarını günceller."""
         try:
             # api_counters = self.data_fetcher.get_api_counters() # Veri çekici modülünden API sayaçlarını al
             # self.api_counter_widget.update_counters(api_counters) # Widget'ı güncelle
-            self.api_counter_label.config(text=f"API Çağrı Sayacı: {time.time()}") # Geçici güncelleme
+            self.data_queue.put(('api', f"API Çağrı Sayacı: {time.time()}")) # Geçici güncelleme
             self.logger.debug("API sayaçları güncellendi.", "API_MONITOR")
         except Exception as e:
             self.logger.error(f"API sayaçları güncellenirken hata: {e}", "API_MONITOR")
@@ -148,7 +204,7 @@ class MainWindow(tk.Tk):
         try:
             # graph_data = self.data_fetcher.get_live_graph_data() # Canlı grafik verilerini al
             # self.graph_widget.update_graph(graph_data) # Grafik widget'ını güncelle
-            self.graph_label.config(text=f"Canlı Grafik Alanı: {time.time()}") # Geçici güncelleme
+            self.data_queue.put(('graph', f"Canlı Grafik Alanı: {time.time()}")) # Geçici güncelleme
             self.logger.debug("Canlı grafik güncellendi.", "GRAPH_UPDATE")
         except Exception as e:
             self.logger.error(f"Canlı grafik güncellenirken hata: {e}", "GRAPH_UPDATE")
@@ -158,7 +214,7 @@ class MainWindow(tk.Tk):
         try:
             # news_items = self.sentiment_analyzer.get_latest_news() # En son haberleri al
             # self.news_widget.display_news(news_items) # Haber widget'ını güncelle
-            self.news_label.config(text=f"Haber Akışı Alanı: {time.time()}") # Geçici güncelleme
+            self.data_queue.put(('news', f"Haber Akışı Alanı: {time.time()}")) # Geçici güncelleme
             self.logger.debug("Haber akışı güncellendi.", "NEWS_FETCHER")
         except Exception as e:
             self.logger.error(f"Haber akışı güncellenirken hata: {e}", "NEWS_FETCHER")
@@ -166,9 +222,9 @@ class MainWindow(tk.Tk):
     def update_signal(self):
         """Ticaret sinyallerini günceller."""
         try:
-            # signal = self.signal_generator.generate_signal() # Sinyal oluştur
+            # signal = self.get_signal_generator(commodity).generate_signals() # Sinyal oluştur
             # self.signal_widget.display_signal(signal) # Sinyal widget'ını güncelle
-            self.signal_label.config(text=f"Sinyal Alanı: {time.time()}") # Geçici güncelleme
+            self.data_queue.put(('signal', f"Sinyal Alanı: {time.time()}")) # Geçici güncelleme
             self.logger.debug("Ticaret sinyali güncellendi.", "SIGNAL_GEN")
         except Exception as e:
             self.logger.error(f"Ticaret sinyali güncellenirken hata: {e}", "SIGNAL_GEN")
@@ -178,7 +234,7 @@ class MainWindow(tk.Tk):
         try:
             # risk_status = self.risk_manager.get_current_risk_status() # Mevcut risk durumunu al
             # self.risk_widget.display_risk_status(risk_status) # Risk widget'ını güncelle
-            self.risk_label.config(text=f"Risk Yönetimi Alanı: {time.time()}") # Geçici güncelleme
+            self.data_queue.put(('risk', f"Risk Yönetimi Alanı: {time.time()}")) # Geçici güncelleme
             self.logger.debug("Risk yönetimi güncellendi.", "RISK_MANAGER")
         except Exception as e:
             self.logger.error(f"Risk yönetimi güncellenirken hata: {e}", "RISK_MANAGER")
@@ -189,6 +245,10 @@ class MainWindow(tk.Tk):
         Logger'ı ve diğer kaynakları düzgün bir şekilde temizler.
         """
         self.logger.info("Uygulama penceresi kapatma isteği alındı, kaynaklar temizleniyor.", "MAIN_APP")
+        # Bekleyen işleri iptal et ve çalışan işçinin bitmesini bekle; ardından tampondaki sinyalleri yaz
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        for generator in self.signal_generators.values():
+            generator.close()
         # Logger'ın tüm handler'larını temizle ve kapat
         self.logger.shutdown() # <-- LOGGER SHUTDOWN BURADA ÇAĞRILIR
         self.destroy() # Tkinter penceresini yok et
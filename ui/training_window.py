@@ -1,29 +1,89 @@
 # ui/training_window.py
+import multiprocessing
+from dataclasses import dataclass
 import tkinter as tk
 from tkinter import ttk
-from threading import Thread
-from queue import Queue
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from queue import Empty, Queue
 from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image, ImageTk
 from .components import DarkTheme
 from modules.model_trainer import ModelTrainer
 from modules.online_learning import OnlineLearner
 from modules.logger import Logger
+import numpy as np
 import pandas as pd
 
+# Tk'nin sanal olayları birleştirmesi ihtimaline karşı düşük frekanslı yedek boşaltma aralığı (ms)
+QUEUE_SAFETY_INTERVAL = 500
+
+# Pencere boyutu değişirken metrik grafiği en fazla bu gecikmeyle (ms) bir kez yeniden çizilir
+PLOT_RESIZE_DELAY = 150
+
+# Özellik tablosunda aynı anda oluşturulan satır sayısı; diğer satırlar kaydırıldıkça bu satırlara yazılır
+FEATURE_TABLE_ROWS = 15
+
+# Backtest raporu şablonu; satır başlarında girinti boşluğu yoktur
+BACKTEST_REPORT_TEMPLATE = (
+    "Backtest Sonuçları ({commodity})\n"
+    "\n"
+    "Doğruluk: {report.accuracy:.2%}\n"
+    "Hassasiyet: {report.precision:.2%}\n"
+    "Geri Çağırma: {report.recall:.2%}\n"
+    "Sharpe Oranı: {report.sharpe_ratio:.2f}\n"
+    "Maksimum Çekilme: {report.max_drawdown:.1f}%"
+)
+
+@dataclass(slots=True)
+class BacktestReport:
+    """Kuyruk üzerinden arayüze iletilen backtest sonuçları"""
+    accuracy: float
+    precision: float
+    recall: float
+    sharpe_ratio: float
+    max_drawdown: float  # Yüzde
+
 class TrainingWindow(tk.Toplevel):
+    # Tema renkleri sınıf düzeyinde bir kez bağlanır
+    _bg, _fg, _warn = DarkTheme.BG, DarkTheme.FG, DarkTheme.WARNING
+    # Kapanan pencerelerin figürleri (figsize -> Figure listesi); yeniden açılışta yeni Figure kurulmaz
+    _fig_pool = {}
+    METRIC_FIGSIZE = (8, 4)
+
     def __init__(self, parent, commodity: str, logger: Logger):
         super().__init__(parent)
         self.commodity = commodity
         self.logger = logger
         self.queue = Queue()
         self.running = True
+        self._int_values = {}  # IntVar adı -> doğrulanmış son değer
+        # Eğitim ilerlemesi (%): işçi kilitsiz yazar, arayüz her uyanışta okur; deneme başına kuyruk mesajı yok
+        self._progress_val = multiprocessing.Value('d', 0.0, lock=False)
+        # Eğitim/backtest işleri tek işçide sırayla çalışır; grafik çizimleri ayrı tek işçide
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='training')
+        self._render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metric-render')
+        self._pending_tasks = 0  # Yalnızca ana iş parçacığında değişir
         
         self.title(f"Model Eğitim - {commodity}")
         self.geometry("1400x800")
-        self.configure(bg=DarkTheme.BG)
+        self.configure(bg=self._bg)
+        
+        # Kuyruk mesaj türü -> ana iş parçacığında çalışan işleyici
+        self._handlers = {
+            'features': self.update_feature_table,
+            'log': self._set_status,
+            'backtest': self.show_backtest_results,
+            'error': self._show_error,
+            'bitmap': self._show_metric_bitmap,
+        }
         
         self.init_ui()
+        # İşçi iş parçacıkları kuyruğa yazdıktan sonra bu olayı üretir; boşaltma olay güdümlüdür
+        self.bind("<<QueueItem>>", self._drain_queue)
+        self.bind("<<TaskDone>>", self._on_task_done)
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         self.start_update_cycle()
 
     def init_ui(self):
@@ -60,13 +120,11 @@ class TrainingWindow(tk.Toplevel):
         
         # Hiperparametreler
         ttk.Label(control_frame, text="Optuna Denemeleri:").grid(row=1, column=0, sticky='w')
-        self.trial_count = ttk.Spinbox(control_frame, from_=50, to=200, width=5)
-        self.trial_count.set(100)
+        self.trial_count, self._trials_var = self._int_spinbox(control_frame, 50, 200, 100)
         self.trial_count.grid(row=1, column=1, sticky='w', padx=5)
         
         ttk.Label(control_frame, text="Lookback Periyodu:").grid(row=2, column=0, sticky='w')
-        self.lookback = ttk.Spinbox(control_frame, from_=30, to=365, width=5)
-        self.lookback.set(90)
+        self.lookback, self._lookback_var = self._int_spinbox(control_frame, 30, 365, 90)
         self.lookback.grid(row=2, column=1, sticky='w', padx=5)
         
         # Eğitim Butonları
@@ -76,14 +134,14 @@ class TrainingWindow(tk.Toplevel):
         self.train_btn = ttk.Button(
             btn_frame,
             text="Eğitimi Başlat",
-            command=lambda: Thread(target=self.start_training, daemon=True).start()
+            command=self._on_train_click
         )
         self.train_btn.pack(side=tk.LEFT, padx=5)
         
         ttk.Button(
             btn_frame,
             text="Backtest Çalıştır",
-            command=lambda: Thread(target=self.run_backtest, daemon=True).start()
+            command=self._on_backtest_click
         ).pack(side=tk.LEFT, padx=5)
         
         # Progress Bar
@@ -96,17 +154,53 @@ class TrainingWindow(tk.Toplevel):
         
         # Feature Importance
         ttk.Label(parent, text="Özellik Önemliliği").pack(pady=5)
+        table_frame = ttk.Frame(parent)
+        table_frame.pack(fill=tk.X, padx=5)
         self.feature_tree = ttk.Treeview(
-            parent,
+            table_frame,
             columns=('Feature', 'Importance'),
             show='headings',
-            height=15
+            height=FEATURE_TABLE_ROWS
         )
         self.feature_tree.heading('Feature', text='Özellik')
         self.feature_tree.heading('Importance', text='Önem')
         self.feature_tree.column('Feature', width=200)
         self.feature_tree.column('Importance', width=80)
-        self.feature_tree.pack(fill=tk.X, padx=5)
+        
+        # Sanal kaydırma: tüm özellikler dizilerde tutulur, Treeview'da yalnızca görünen satırlar bulunur
+        self._feature_names = np.empty(0, dtype=object)
+        self._feature_importances = np.empty(0)
+        self._feature_offset = 0
+        self._feature_slots = 0  # Treeview'da şu an var olan row0..rowN öğe sayısı
+        self.feature_scroll = ttk.Scrollbar(table_frame, orient=tk.VERTICAL, command=self._scroll_features)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.feature_tree.bind(sequence, self._on_feature_wheel)
+        self.feature_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.feature_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+
+    def _int_spinbox(self, parent, low: int, high: int, value: int):
+        """
+        Değeri tipli bir IntVar'da tutan Spinbox döndürür.
+        Her yazımda [low, high] aralığına sıkıştırılmış son geçerli değer _int_values'ta önbelleğe alınır;
+        odak çıkışında metin bu değere düzeltilir (yazım sürerken ara değerler düzeltilmez).
+        """
+        var = tk.IntVar(value=value)
+        spinbox = ttk.Spinbox(parent, from_=low, to=high, width=5, textvariable=var)
+        self._int_values[str(var)] = value
+
+        def on_write(*_):
+            try:
+                self._int_values[str(var)] = min(max(var.get(), low), high)
+            except tk.TclError:
+                pass  # Boş veya sayısal olmayan ara metin
+
+        def normalize(event=None):
+            var.set(self._int_values[str(var)])
+
+        var.trace_add('write', on_write)
+        spinbox.bind('<FocusOut>', normalize)
+        spinbox.bind('<Return>', normalize)
+        return spinbox, var
 
     def create_visualizations(self, parent):
         """Grafik ve metrik panelleri"""
@@ -114,19 +208,37 @@ class TrainingWindow(tk.Toplevel):
         notebook.pack(fill=tk.BOTH, expand=True)
         
         # Metrik Grafikleri
-        self.metric_fig = Figure(figsize=(8, 4), facecolor=DarkTheme.BG)
+        pool = self._fig_pool.get(self.METRIC_FIGSIZE)
+        if pool:
+            self.metric_fig = pool.pop()
+            self.metric_fig.set_size_inches(self.METRIC_FIGSIZE)
+        else:
+            self.metric_fig = Figure(figsize=self.METRIC_FIGSIZE, facecolor=self._bg)
         self.metric_ax = self.metric_fig.add_subplot(111)
-        self.metric_ax.set_facecolor(DarkTheme.BG)
-        self.metric_canvas = FigureCanvasTkAgg(self.metric_fig, notebook)
+        self.metric_ax.set_facecolor(self._bg)
+        # Kayıp çizgileri bir kez oluşturulur; güncellemede yalnızca verileri değişir
+        self.train_line, = self.metric_ax.plot([], [], label='Eğitim Kaybı')
+        self.val_line, = self.metric_ax.plot([], [], label='Validasyon Kaybı')
+        self.metric_ax.legend()
+        # Figür Tk'ye bağlı olmayan Agg tuvalinde arka plan iş parçacığında çizilir; Tk tarafı yalnızca
+        # hazır bitmap'i düz bir Canvas'a yapıştırır. Kilit, figüre aynı anda tek iş parçacığının dokunmasını sağlar
+        self.metric_agg = FigureCanvasAgg(self.metric_fig)
+        self._metric_lock = Lock()
+        self._render_pending = False  # draw_idle karşılığı: bekleyen çizim varken yenisi kuyruğa eklenmez
         metric_tab = ttk.Frame(notebook)
-        self.metric_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.plot_canvas = tk.Canvas(metric_tab, bg=self._bg, highlightthickness=0)
+        self.plot_canvas.pack(fill=tk.BOTH, expand=True)
+        self._plot_item = self.plot_canvas.create_image(0, 0, anchor='nw')
+        self._plot_image = None  # PhotoImage referansı tutulmazsa Tk görüntüyü bırakır
+        self._resize_job = None
+        self.plot_canvas.bind('<Configure>', self._on_plot_resize)
         notebook.add(metric_tab, text="Eğitim Metrikleri")
         
         # Backtest Sonuçları
         self.backtest_text = tk.Text(
             notebook,
-            bg=DarkTheme.BG,
-            fg=DarkTheme.FG,
+            bg=self._bg,
+            fg=self._fg,
             wrap=tk.WORD
         )
         notebook.add(self.backtest_text, text="Backtest Raporu")
@@ -140,96 +252,229 @@ class TrainingWindow(tk.Toplevel):
         )
         self.status.pack(fill=tk.X, padx=10, pady=2)
 
-    def start_training(self):
-        """Model eğitimini başlat"""
+    def _on_train_click(self):
+        """Widget durumunu ana iş parçacığında ayarla, eğitimi arka planda başlat"""
+        self.train_btn.config(state=tk.DISABLED)
+        self._set_status("Model eğitimi başlatılıyor...")
+        n_trials = self._int_values[str(self._trials_var)]
+        self._progress_val.value = 0.0
+        self._submit(self.start_training, n_trials)
+
+    def _on_backtest_click(self):
+        self._set_status("Backtest çalıştırılıyor...")
+        self._submit(self.run_backtest)
+
+    def _submit(self, func, *args):
+        """İşi tek işçili havuza gönderir; bitince ana döngüye <<TaskDone>> olayı üretilir"""
+        self._pending_tasks += 1
+        future = self._executor.submit(func, *args)
+        future.add_done_callback(self._notify_task_done)
+
+    def _notify_task_done(self, future):
+        # Pencere kapanırken iptal edilen işler için olay üretilmez
+        if self.running:
+            self.event_generate("<<TaskDone>>", when="tail")
+
+    def _on_task_done(self, event=None):
+        """Sırada iş kalmadıysa eğitim düğmesini yeniden etkinleştir"""
+        self._pending_tasks -= 1
+        if self._pending_tasks == 0:
+            self.train_btn.config(state=tk.NORMAL)
+
+    def start_training(self, n_trials: int):
+        """Model eğitimini başlat (arka plan iş parçacığı; widget'lara yalnızca kuyruk üzerinden erişir)"""
         try:
-            self.train_btn.config(state=tk.DISABLED)
-            self.status.config(text="Model eğitimi başlatılıyor...")
-            
             trainer = ModelTrainer(self.commodity, self.logger)
-            trainer.optimize_hyperparameters(n_trials=int(self.trial_count.get()))
-            model = trainer.train_final_model()
+            X, y = trainer.load_data()
+            if X is None:
+                self.post('error', "Eğitim verisi yüklenemedi")
+                return
+            trainer.optimize_hyperparameters(X, y, n_trials=n_trials, progress=self._progress_val)
+            model = trainer.train_final_model(X, y)
             
-            self.queue.put(('progress', 100))
-            self.queue.put(('features', trainer.feature_importance))
-            self.queue.put(('log', "Eğitim başarıyla tamamlandı!"))
+            self._progress_val.value = 100.0
+            self.post('features', trainer.feature_importance)
+            self.post('log', "Eğitim başarıyla tamamlandı!")
             
         except Exception as e:
             self.logger.error(f"Eğitim hatası: {str(e)}", "TRAINING_WINDOW")
-            self.queue.put(('error', str(e)))
+            self.post('error', str(e))
 
     def run_backtest(self):
         """Backtest işlemini çalıştır"""
         try:
-            self.status.config(text="Backtest çalıştırılıyor...")
-            
             # Backtest mantığı buraya eklenecek
-            report = {
-                'accuracy': 0.78,
-                'precision': 0.81,
-                'recall': 0.75,
-                'sharpe_ratio': 1.45,
-                'max_drawdown': -12.5
-            }
+            report = BacktestReport(
+                accuracy=0.78,
+                precision=0.81,
+                recall=0.75,
+                sharpe_ratio=1.45,
+                max_drawdown=-12.5
+            )
             
-            self.queue.put(('backtest', report))
+            self.post('backtest', report)
             
         except Exception as e:
             self.logger.error(f"Backtest hatası: {str(e)}", "TRAINING_WINDOW")
+            self.post('error', str(e))
 
     def update_metrics(self, data):
-        """Metrikleri gerçek zamanlı güncelle"""
-        # Grafikleri yeniden çiz
-        self.metric_ax.clear()
-        self.metric_ax.plot(data['train_loss'], label='Eğitim Kaybı')
-        self.metric_ax.plot(data['val_loss'], label='Validasyon Kaybı')
-        self.metric_ax.legend()
-        self.metric_canvas.draw()
+        """Metrikleri gerçek zamanlı güncelle (arka plan iş parçacığından çağrılabilir)"""
+        train_loss = np.asarray(data['train_loss'], dtype=np.float64)
+        val_loss = np.asarray(data['val_loss'], dtype=np.float64)
+        with self._metric_lock:
+            if not self.running:
+                return  # Figür havuza geri verilmiş olabilir
+            self.train_line.set_data(np.arange(train_loss.size), train_loss)
+            self.val_line.set_data(np.arange(val_loss.size), val_loss)
+            self.metric_ax.relim()
+            self.metric_ax.autoscale_view()
+        self._request_render()
+
+    def _request_render(self):
+        """
+        Çizimi çizim işçisine planlar. Önceki istek henüz çizilmediyse yeni iş eklenmez; art arda gelen
+        güncellemeler tek çizimde birleşir (Tk tuvalindeki draw_idle davranışı).
+        """
+        with self._metric_lock:
+            if self._render_pending:
+                return
+            self._render_pending = True
+        self._render_executor.submit(self._render_metrics)
+
+    def _render_metrics(self):
+        """Figürü Agg ile RGBA dizisine çizer ve kuyruğa koyar (çizim işçisi)"""
+        with self._metric_lock:
+            self._render_pending = False
+            if not self.running:
+                return
+            # Agg'nin çizimi eşzamanlıdır; tampon hemen okunacağı için burada draw_idle kullanılmaz
+            self.metric_agg.draw()
+            # Agg tamponu bir sonraki çizimde yeniden kullanılır; kuyruğa kopyası konur
+            bitmap = np.array(self.metric_agg.buffer_rgba())
+        self.post('bitmap', bitmap)
+
+    def _on_plot_resize(self, event):
+        """Boyut değişikliklerini birleştirir; son boyut için tek bir arka plan çizimi planlar"""
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(PLOT_RESIZE_DELAY, self._start_resize_render, event.width, event.height)
+
+    def _start_resize_render(self, width: int, height: int):
+        self._resize_job = None
+        self._render_executor.submit(self._resize_metrics, width, height)
+
+    def _resize_metrics(self, width: int, height: int):
+        """Figürü tuval boyutuna getirip yeniden çizim ister"""
+        with self._metric_lock:
+            if not self.running:
+                return
+            dpi = self.metric_fig.dpi
+            self.metric_fig.set_size_inches(width / dpi, height / dpi)
+        self._request_render()
+
+    def _show_metric_bitmap(self, bitmap: np.ndarray):
+        """Hazır RGBA bitmap'i Tk tuvaline yapıştırır (ana iş parçacığı)"""
+        self._plot_image = ImageTk.PhotoImage(Image.fromarray(bitmap))
+        self.plot_canvas.itemconfig(self._plot_item, image=self._plot_image)
+
+    def post(self, kind: str, payload):
+        """İşçi iş parçacığından kuyruğa öğe ekler ve ana döngüyü olayla uyandırır"""
+        self.queue.put((kind, payload))
+        self.event_generate("<<QueueItem>>", when="tail")
 
     def start_update_cycle(self):
-        """Kuyruktaki verileri işle"""
-        if not self.queue.empty():
-            item = self.queue.get_nowait()
-            
-            if item[0] == 'progress':
-                self.progress['value'] = item[1]
-            elif item[0] == 'features':
-                self.update_feature_table(item[1])
-            elif item[0] == 'log':
-                self.status.config(text=item[1])
-            elif item[0] == 'backtest':
-                self.show_backtest_results(item[1])
-            elif item[0] == 'error':
-                self.status.config(text=f"Hata: {item[1]}", foreground=DarkTheme.WARNING)
-                self.train_btn.config(state=tk.NORMAL)
-                
-        self.after(100, self.start_update_cycle)
+        """Yedek boşaltma: birleştirilmiş/kaçırılmış olaylar için kuyruğu seyrek aralıkla kontrol et"""
+        if not self.running:
+            return
+        self._drain_queue()
+        self.after(QUEUE_SAFETY_INTERVAL, self.start_update_cycle)
+
+    def _drain_queue(self, event=None):
+        """Kuyruktaki tüm öğeleri tek seferde işle"""
+        self.progress['value'] = self._progress_val.value
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except Empty:
+                break
+            kind, payload = item
+            self._handlers[kind](payload)
+
+    def _set_status(self, text: str):
+        self.status.config(text=text)
+
+    def _show_error(self, message: str):
+        self.status.config(text=f"Hata: {message}", foreground=self._warn)
 
     def update_feature_table(self, df):
         """Özellik önemliliğini güncelle"""
-        self.feature_tree.delete(*self.feature_tree.get_children())
-        for _, row in df.iterrows():
-            self.feature_tree.insert('', tk.END, values=(
-                row['feature'],
-                f"{row['importance']:.4f}"
-            ))
-
-    def show_backtest_results(self, report):
+        # Sütunlar bir kez alınır ve önem sırasına dizilir; satırlar yalnızca görünür oldukça biçimlendirilir
+        importances = df['importance'].to_numpy()
+        order = np.argsort(-importances, kind='stable')
+        self._feature_names = df['feature'].to_numpy()[order]
+        self._feature_importances = importances[order]
+        self._feature_offset = 0
+        self._render_features()
+
+    def _render_features(self):
+        """Görünür pencereyi sabit satırlara (row0..rowN) yazar; satırlar silinmeden yeniden kullanılır"""
+        tree = self.feature_tree
+        total = len(self._feature_names)
+        start = self._feature_offset
+        end = min(start + FEATURE_TABLE_ROWS, total)
+        fmt = "{:.4f}".format
+        visible = end - start
+        # Var olan öğeler Python tarafında sayılır (satır başına exists() gidiş-dönüşü yok);
+        # fazlalar tek delete çağrısıyla kaldırılır
+        if self._feature_slots > visible:
+            tree.delete(*(f"row{slot}" for slot in range(visible, self._feature_slots)))
+        for slot, index in enumerate(range(start, end)):
+            values = (self._feature_names[index], fmt(self._feature_importances[index]))
+            if slot < self._feature_slots:
+                tree.item(f"row{slot}", values=values)
+            else:
+                tree.insert('', tk.END, iid=f"row{slot}", values=values)
+        self._feature_slots = visible
+        if total:
+            self.feature_scroll.set(start / total, end / total)
+        else:
+            self.feature_scroll.set(0.0, 1.0)
+
+    def _on_feature_wheel(self, event):
+        """Fare tekerleği (Windows/macOS delta, X11 Button-4/5) ile tabloyu bir satır kaydırır"""
+        self._scroll_features('scroll', -1 if event.num == 4 or event.delta > 0 else 1, 'units')
+        return 'break'
+
+    def _scroll_features(self, action, amount, unit=None):
+        """Kaydırma çubuğu/tekerlek komutlarını ('moveto', kesir) veya ('scroll', n, birim) pencere kaymasına çevirir"""
+        total = len(self._feature_names)
+        if action == 'moveto':
+            offset = int(float(amount) * total)
+        else:
+            step = FEATURE_TABLE_ROWS if unit == 'pages' else 1
+            offset = self._feature_offset + int(amount) * step
+        offset = max(0, min(offset, total - FEATURE_TABLE_ROWS))
+        if offset != self._feature_offset:
+            self._feature_offset = offset
+            self._render_features()
+
+    def show_backtest_results(self, report: BacktestReport):
         """Backtest sonuçlarını göster"""
-        text = f"""Backtest Sonuçları ({self.commodity})
-        \nDoğruluk: {report['accuracy']:.2%}
-        Hassasiyet: {report['precision']:.2%}
-        Geri Çağırma: {report['recall']:.2%}
-        Sharpe Oranı: {report['sharpe_ratio']:.2f}
-        Maksimum Çekilme: {report['max_drawdown']:.1f}%"""
-        
-        self.backtest_text.delete(1.0, tk.END)
-        self.backtest_text.insert(tk.END, text)
+        text = BACKTEST_REPORT_TEMPLATE.format(commodity=self.commodity, report=report)
+        # Silme + ekleme yerine tek Tcl çağrısı
+        self.backtest_text.replace('1.0', tk.END, text)
         self.status.config(text="Backtest tamamlandı")
 
     def on_close(self):
         """Pencere kapanırken kaynakları temizle"""
         self.running = False
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._render_executor.shutdown(wait=False, cancel_futures=True)
+        # Devam eden çizim bitince figürü temizleyip havuza geri ver
+        with self._metric_lock:
+            self.metric_fig.clear()
+            self._fig_pool.setdefault(self.METRIC_FIGSIZE, []).append(self.metric_fig)
         self.destroy()
 
 # Örnek Kullanım